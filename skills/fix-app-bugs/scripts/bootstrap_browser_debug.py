@@ -1,51 +1,106 @@
 #!/usr/bin/env python3
 import argparse
+import atexit
 import copy
 import difflib
+import functools
 import json
 import os
+import random
 import re
 import shlex
 import shutil
 import subprocess
 import sys
+import tempfile
 import time
 import uuid
+from collections.abc import Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from http.client import HTTPException, HTTPMessage
 from pathlib import Path
+from types import MappingProxyType
 from typing import Any, Dict, List, Optional, Tuple
-from urllib.error import HTTPError, URLError
-from urllib.parse import urlencode, urlparse
-from urllib.request import Request, urlopen
+from urllib.parse import ParseResult, urlencode, urlparse
+
+# Sibling helper modules ship in this directory; make them importable however the script was loaded.
+SCRIPT_DIR = Path(__file__).resolve().parent
+if str(SCRIPT_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPT_DIR))
+
+from http_keep_alive import KeepAliveConnectionPool  # noqa: E402
 
 DEFAULT_PLUGIN_ROOT = Path(
     "/Users/vladimirpuskarev/Library/Mobile Documents/com~apple~CloudDocs/Codex/Browser Extension"
 )
-LOOPBACK_DOMAINS = ("localhost", "127.0.0.1")
+# Ordered tuple for recommendations output; frozenset for membership checks.
+LOOPBACK_DOMAIN_ORDER = ("localhost", "127.0.0.1")
+LOOPBACK_DOMAINS = frozenset(LOOPBACK_DOMAIN_ORDER)
+HEALTH_POLL_INITIAL_DELAY_SECONDS = 0.05
+HEALTH_POLL_MAX_DELAY_SECONDS = 0.5
+HEALTH_POLL_BACKOFF_FACTOR = 1.5
+SHELL_SAFE_ARG_PATTERN = re.compile(r"\A[\w@%+=:,./-]+\Z", re.ASCII)
+GUARDED_BOOTSTRAP_SCRIPT = SCRIPT_DIR / "bootstrap_guarded.py"
+ENDPOINT_UNAVAILABLE_PATTERN = re.compile(
+    r"connection|refused|timed out|timeout|unreachable|name or service not known|nodename nor servname provided",
+    re.IGNORECASE,
+)
+INSTRUMENTATION_CHECK_NAMES = ("appUrl", "preflight", "debugPost", "query")
+EMPTY_CHECK: Mapping[str, Any] = MappingProxyType({})
+JSON_LEADING_CHARS = frozenset('{["-0123456789tfnNI')
+QUERY_PROBE_MAX_ATTEMPTS = 3
+QUERY_PROBE_WAIT_MS = 1000
+QUERY_PROBE_BASE_DELAY_SECONDS = 0.05
+QUERY_PROBE_MAX_DELAY_SECONDS = 0.8
+QUERY_PROBE_JITTER_SECONDS = 0.05
+PLAYWRIGHT_CHECK_ENV_KEYS = ("CODEX_HOME", "PLAYWRIGHT_WRAPPER_PATH", "PLAYWRIGHT_FUNCTIONAL_SMOKE")
+
+cached_urlparse = functools.lru_cache(maxsize=256)(urlparse)
+
+
+class SlugTranslationTable(dict):
+    def __missing__(self, codepoint: int) -> str:
+        return "-"
+
+
+SLUG_TRANSLATION_TABLE = SlugTranslationTable(
+    {ord(char): char for char in "abcdefghijklmnopqrstuvwxyz0123456789-"}
+)
+SLUG_DASH_RUN_PATTERN = re.compile(r"-+")
 
 
 def slugify(value: str) -> str:
-    slug = re.sub(r"[^a-zA-Z0-9-]+", "-", value.strip().lower())
-    slug = re.sub(r"-+", "-", slug).strip("-")
+    slug = value.strip().lower().translate(SLUG_TRANSLATION_TABLE)
+    slug = SLUG_DASH_RUN_PATTERN.sub("-", slug).strip("-")
     return slug or "project"
 
 
+def format_iso(moment: datetime) -> str:
+    return moment.isoformat().replace("+00:00", "Z")
+
+
 def iso_now() -> str:
-    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    return format_iso(datetime.now(timezone.utc))
 
 
 def parse_json_or_none(raw: str) -> Optional[Any]:
     if not raw:
         return None
+    stripped = raw.lstrip()
+    if not stripped or stripped[0] not in JSON_LEADING_CHARS:
+        # Skip the exception path for HTML error pages and other plain-text bodies.
+        return None
     try:
         return json.loads(raw)
     except ValueError:
         return None
 
 
+@functools.lru_cache(maxsize=256)
 def canonicalize_url(raw_url: str) -> str:
     value = raw_url.strip()
-    parsed = urlparse(value)
+    parsed = cached_urlparse(value)
     if parsed.scheme not in {"http", "https"} or not parsed.hostname:
         raise RuntimeError(f"Invalid URL: {raw_url}")
 
@@ -57,9 +112,13 @@ def canonicalize_url(raw_url: str) -> str:
     return f"{parsed.scheme}://{parsed.netloc}{path}{query}{fragment}"
 
 
+@functools.lru_cache(maxsize=256)
+def parse_canonical_url(raw_url: str) -> ParseResult:
+    return cached_urlparse(canonicalize_url(raw_url))
+
+
 def get_origin(raw_url: str) -> str:
-    parsed = urlparse(canonicalize_url(raw_url))
-    return f"{parsed.scheme}://{parsed.netloc}"
+    return parse_origin_parts(raw_url)["origin"]
 
 
 def default_port(scheme: str) -> int:
@@ -68,31 +127,45 @@ def default_port(scheme: str) -> int:
     return 80
 
 
-def parse_origin_parts(raw_url: str) -> Dict[str, Any]:
-    parsed = urlparse(canonicalize_url(raw_url))
+# The cached result is shared between callers, so it is handed out as a read-only view.
+@functools.lru_cache(maxsize=256)
+def parse_origin_parts(raw_url: str) -> Mapping[str, Any]:
+    parsed = parse_canonical_url(raw_url)
     scheme = parsed.scheme.lower()
     hostname = (parsed.hostname or "").lower()
     port = parsed.port if parsed.port is not None else default_port(scheme)
-    return {
-        "scheme": scheme,
-        "hostname": hostname,
-        "port": port,
-    }
+    return MappingProxyType(
+        {
+            "scheme": scheme,
+            "hostname": hostname,
+            "port": port,
+            "origin": f"{parsed.scheme}://{parsed.netloc}",
+        }
+    )
 
 
-def canonical_origin_for_match(raw_url: str) -> str:
-    parts = parse_origin_parts(raw_url)
+def derive_origins(parts: Mapping[str, Any]) -> Tuple[str, str]:
     hostname = parts["hostname"]
     if hostname in LOOPBACK_DOMAINS:
         hostname = "loopback"
-    return f"{parts['scheme']}://{hostname}:{parts['port']}"
+    return parts["origin"], f"{parts['scheme']}://{hostname}:{parts['port']}"
 
 
-def evaluate_origin_match(config_app_url: str, actual_app_url: str) -> Dict[str, Any]:
-    config_origin = get_origin(config_app_url)
-    actual_origin = get_origin(actual_app_url)
+@functools.lru_cache(maxsize=256)
+def canonical_origin_for_match(raw_url: str) -> str:
+    return derive_origins(parse_origin_parts(raw_url))[1]
+
+
+def evaluate_origin_match(
+    config_app_url: str,
+    actual_app_url: str,
+    out: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    result = out if out is not None else {}
     config_parts = parse_origin_parts(config_app_url)
     actual_parts = parse_origin_parts(actual_app_url)
+    config_origin, canonical_config_origin = derive_origins(config_parts)
+    actual_origin, canonical_actual_origin = derive_origins(actual_parts)
 
     exact_match = (
         config_parts["scheme"] == actual_parts["scheme"]
@@ -107,63 +180,62 @@ def evaluate_origin_match(config_app_url: str, actual_app_url: str) -> Dict[str,
     )
 
     if exact_match:
-        return {
-            "ok": True,
-            "status": "match",
-            "reason": None,
-            "matchType": "exact",
-            "needsConfigSync": False,
-            "configOrigin": config_origin,
-            "actualOrigin": actual_origin,
-            "canonicalConfigOrigin": canonical_origin_for_match(config_app_url),
-            "canonicalActualOrigin": canonical_origin_for_match(actual_app_url),
-        }
-
-    if loopback_equivalent:
-        return {
-            "ok": True,
-            "status": "match",
-            "reason": (
-                "config/actual origins are loopback-equivalent "
-                f"({config_origin} ~= {actual_origin})"
-            ),
-            "matchType": "loopback-equivalent",
-            "needsConfigSync": True,
-            "configOrigin": config_origin,
-            "actualOrigin": actual_origin,
-            "canonicalConfigOrigin": canonical_origin_for_match(config_app_url),
-            "canonicalActualOrigin": canonical_origin_for_match(actual_app_url),
-        }
+        result["ok"] = True
+        result["status"] = "match"
+        result["reason"] = None
+        result["matchType"] = "exact"
+        result["needsConfigSync"] = False
+    elif loopback_equivalent:
+        result["ok"] = True
+        result["status"] = "match"
+        result["reason"] = (
+            "config/actual origins are loopback-equivalent "
+            f"({config_origin} ~= {actual_origin})"
+        )
+        result["matchType"] = "loopback-equivalent"
+        result["needsConfigSync"] = True
+    else:
+        result["ok"] = False
+        result["status"] = "mismatch"
+        result["reason"] = f"config origin {config_origin} differs from actual origin {actual_origin}"
+        result["matchType"] = "mismatch"
+        result["needsConfigSync"] = True
 
-    return {
-        "ok": False,
-        "status": "mismatch",
-        "reason": f"config origin {config_origin} differs from actual origin {actual_origin}",
-        "matchType": "mismatch",
-        "needsConfigSync": True,
-        "configOrigin": config_origin,
-        "actualOrigin": actual_origin,
-        "canonicalConfigOrigin": canonical_origin_for_match(config_app_url),
-        "canonicalActualOrigin": canonical_origin_for_match(actual_app_url),
-    }
+    result["configOrigin"] = config_origin
+    result["actualOrigin"] = actual_origin
+    result["canonicalConfigOrigin"] = canonical_config_origin
+    result["canonicalActualOrigin"] = canonical_actual_origin
+    return result
 
 
 def is_loopback_url(raw_url: str) -> bool:
-    parsed = urlparse(canonicalize_url(raw_url))
-    hostname = (parsed.hostname or "").lower()
-    return hostname in LOOPBACK_DOMAINS
+    return parse_origin_parts(raw_url)["hostname"] in LOOPBACK_DOMAINS
 
 
 def normalize_domains(raw_domains: List[Any]) -> List[str]:
-    normalized: List[str] = []
-    seen = set()
-    for item in raw_domains:
-        value = str(item).strip().lower()
-        if not value or value in seen:
-            continue
-        normalized.append(value)
-        seen.add(value)
-    return normalized
+    return list(dict.fromkeys(value for value in (str(item).strip().lower() for item in raw_domains) if value))
+
+
+class LowerHeaderView(Mapping):
+    def __init__(self, message: HTTPMessage) -> None:
+        self.message = message
+
+    def __getitem__(self, key: str) -> str:
+        value = self.message.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(dict.fromkeys(key.lower() for key in self.message.keys()))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+# Sized so every concurrent bootstrap probe can park its socket for reuse.
+HTTP_POOL = KeepAliveConnectionPool(max_idle_per_origin=8)
+atexit.register(HTTP_POOL.clear)
 
 
 def http_request(
@@ -172,38 +244,26 @@ def http_request(
     payload: Optional[Dict[str, Any]] = None,
     headers: Optional[Dict[str, str]] = None,
     timeout: float = 1.5,
+    body: Optional[bytes] = None,
 ) -> Dict[str, Any]:
     request_headers: Dict[str, str] = {"Content-Type": "application/json"}
     if headers:
         request_headers.update(headers)
 
-    body = None
-    if payload is not None:
+    if body is None and payload is not None:
         body = json.dumps(payload).encode("utf-8")
 
-    request = Request(url=url, data=body, headers=request_headers, method=method)
-
     try:
-        with urlopen(request, timeout=timeout) as response:
-            raw_body = response.read().decode("utf-8")
-            return {
-                "ok": 200 <= response.status < 300,
-                "status": response.status,
-                "headers": {str(k).lower(): str(v) for k, v in response.headers.items()},
-                "body": raw_body,
-                "json": parse_json_or_none(raw_body),
-            }
-    except HTTPError as exc:
-        raw_body = exc.read().decode("utf-8", errors="replace")
-        return {
-            "ok": False,
-            "status": exc.code,
-            "headers": {str(k).lower(): str(v) for k, v in (exc.headers.items() if exc.headers else [])},
-            "body": raw_body,
-            "json": parse_json_or_none(raw_body),
-            "error": str(exc),
-        }
-    except (URLError, TimeoutError, ValueError) as exc:
+        status, reason, response_headers, raw_bytes = HTTP_POOL.request(
+            method,
+            url,
+            body=body,
+            headers=request_headers,
+            timeout=timeout,
+        )
+        ok = 200 <= status < 300
+        raw_body = raw_bytes.decode("utf-8") if ok else raw_bytes.decode("utf-8", errors="replace")
+    except (OSError, HTTPException, ValueError) as exc:
         return {
             "ok": False,
             "status": None,
@@ -213,6 +273,17 @@ def http_request(
             "error": str(exc),
         }
 
+    response = {
+        "ok": ok,
+        "status": status,
+        "headers": LowerHeaderView(response_headers),
+        "body": raw_body,
+        "json": parse_json_or_none(raw_body),
+    }
+    if not ok:
+        response["error"] = f"HTTP Error {status}: {reason}"
+    return response
+
 
 def check_health(core_base_url: str, timeout: float = 1.0) -> Optional[Dict[str, Any]]:
     response = http_request("GET", f"{core_base_url}/health", timeout=timeout)
@@ -227,32 +298,40 @@ def check_health(core_base_url: str, timeout: float = 1.0) -> Optional[Dict[str,
 
 
 def wait_for_health(core_base_url: str, deadline_seconds: float = 15.0) -> Optional[Dict[str, Any]]:
-    started = time.time()
-    while time.time() - started <= deadline_seconds:
+    deadline = time.monotonic() + deadline_seconds
+    delay = HEALTH_POLL_INITIAL_DELAY_SECONDS
+    while True:
         payload = check_health(core_base_url)
         if payload:
             return payload
-        time.sleep(0.5)
-    return None
-
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        time.sleep(min(delay, remaining))
+        delay = min(HEALTH_POLL_MAX_DELAY_SECONDS, delay * HEALTH_POLL_BACKOFF_FACTOR)
 
-def resolve_plugin_root(plugin_root_arg: Optional[str]) -> Path:
-    if plugin_root_arg:
-        root = Path(plugin_root_arg).expanduser().resolve()
-    elif os.environ.get("BROWSER_DEBUG_PLUGIN_ROOT"):
-        root = Path(os.environ["BROWSER_DEBUG_PLUGIN_ROOT"]).expanduser().resolve()
-    else:
-        root = DEFAULT_PLUGIN_ROOT
 
+@functools.lru_cache(maxsize=4)
+def read_plugin_package_json(root: Path) -> Dict[str, Any]:
     package_json = root / "package.json"
     if not package_json.exists():
         raise RuntimeError(f"Plugin root is invalid: {root} (package.json not found)")
 
     try:
-        package = json.loads(package_json.read_text(encoding="utf-8"))
+        return json.loads(package_json.read_text(encoding="utf-8"))
     except json.JSONDecodeError as exc:
         raise RuntimeError(f"Plugin package.json is invalid JSON: {exc}") from exc
 
+
+def resolve_plugin_root(plugin_root_arg: Optional[str]) -> Path:
+    if plugin_root_arg:
+        root = Path(plugin_root_arg).expanduser().resolve()
+    elif os.environ.get("BROWSER_DEBUG_PLUGIN_ROOT"):
+        root = Path(os.environ["BROWSER_DEBUG_PLUGIN_ROOT"]).expanduser().resolve()
+    else:
+        root = DEFAULT_PLUGIN_ROOT
+
+    package = read_plugin_package_json(root)
     if package.get("name") != "browser-debug-plugin":
         raise RuntimeError(f"Plugin root {root} does not contain browser-debug-plugin")
 
@@ -261,7 +340,7 @@ def resolve_plugin_root(plugin_root_arg: Optional[str]) -> Path:
 
 def default_project_config(project_root: Path) -> Dict[str, Any]:
     app_url = "http://localhost:3000"
-    app_host = urlparse(app_url).hostname or "localhost"
+    app_host = cached_urlparse(app_url).hostname or "localhost"
 
     return {
         "version": 1,
@@ -285,6 +364,42 @@ def default_project_config(project_root: Path) -> Dict[str, Any]:
     }
 
 
+def current_umask() -> int:
+    # os.umask can only be read by setting it; the placeholder is a common default, not 0.
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+def write_project_config(config_path: Path, config: Dict[str, Any]) -> None:
+    # Project config is hand-edited and shown in recommendedDiff, so it stays pretty-printed.
+    # Write to a sibling temp file and rename so a crash never leaves a truncated config.
+    temp_path: Optional[Path] = None
+    try:
+        with tempfile.NamedTemporaryFile(
+            "w",
+            encoding="utf-8",
+            dir=config_path.parent,
+            prefix=f".{config_path.name}.",
+            suffix=".tmp",
+            delete=False,
+        ) as handle:
+            temp_path = Path(handle.name)
+            json.dump(config, handle, indent=2, ensure_ascii=True)
+            handle.write("\n")
+        # mkstemp creates 0600 files; keep an existing config's mode, otherwise honor the umask.
+        if config_path.exists():
+            mode = config_path.stat().st_mode & 0o777
+        else:
+            mode = 0o666 & ~current_umask()
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, config_path)
+    except BaseException:
+        if temp_path is not None:
+            temp_path.unlink(missing_ok=True)
+        raise
+
+
 def ensure_project_config(project_root: Path) -> Tuple[Path, Dict[str, Any], bool]:
     config_dir = project_root / ".codex"
     config_path = config_dir / "browser-debug.json"
@@ -292,7 +407,7 @@ def ensure_project_config(project_root: Path) -> Tuple[Path, Dict[str, Any], boo
     if not config_path.exists():
         config_dir.mkdir(parents=True, exist_ok=True)
         config = default_project_config(project_root)
-        config_path.write_text(json.dumps(config, indent=2, ensure_ascii=True) + "\n", encoding="utf-8")
+        write_project_config(config_path, config)
         return config_path, config, True
 
     try:
@@ -314,7 +429,7 @@ def validate_config(config: Dict[str, Any]) -> Dict[str, Any]:
 
     app_url = canonicalize_url(str(config["appUrl"]))
     config["appUrl"] = app_url
-    parsed = urlparse(app_url)
+    parsed = cached_urlparse(app_url)
 
     agent = config["agent"]
     for key in ["host", "corePort", "debugPort"]:
@@ -346,7 +461,7 @@ def validate_config(config: Dict[str, Any]) -> Dict[str, Any]:
 
 
 def evaluate_app_url_check(config_app_url: str, actual_app_url: Optional[str]) -> Dict[str, Any]:
-    config_origin = get_origin(config_app_url)
+    config_origin, canonical_config_origin = derive_origins(parse_origin_parts(config_app_url))
     check: Dict[str, Any] = {
         "ok": False,
         "status": "not-provided",
@@ -354,7 +469,7 @@ def evaluate_app_url_check(config_app_url: str, actual_app_url: Optional[str]) -
         "actualAppUrl": None,
         "configOrigin": config_origin,
         "actualOrigin": None,
-        "canonicalConfigOrigin": canonical_origin_for_match(config_app_url),
+        "canonicalConfigOrigin": canonical_config_origin,
         "canonicalActualOrigin": None,
         "matchType": "not-evaluated",
         "needsConfigSync": False,
@@ -374,13 +489,14 @@ def evaluate_app_url_check(config_app_url: str, actual_app_url: Optional[str]) -
         return check
 
     check["actualAppUrl"] = normalized_actual
-    origin_check = evaluate_origin_match(config_app_url, normalized_actual)
-    check.update(origin_check)
-    return check
+    return evaluate_origin_match(config_app_url, normalized_actual, out=check)
 
 
 def render_shell_command(args: List[str]) -> str:
-    return " ".join(shlex.quote(arg) for arg in args)
+    rendered: List[str] = []
+    for arg in args:
+        rendered.append(arg if SHELL_SAFE_ARG_PATTERN.match(arg) else shlex.quote(arg))
+    return " ".join(rendered)
 
 
 def build_guarded_bootstrap_command(
@@ -390,7 +506,7 @@ def build_guarded_bootstrap_command(
 ) -> str:
     command = [
         "python3",
-        str(Path(__file__).resolve().parent / "bootstrap_guarded.py"),
+        str(GUARDED_BOOTSTRAP_SCRIPT),
         "--project-root",
         str(project_root),
         "--actual-app-url",
@@ -409,8 +525,10 @@ def enrich_app_url_check(
     recommended_actual_app_url: Optional[str],
     has_recommendations: bool,
     applied_recommendations: bool,
+    mutate: bool = False,
 ) -> Dict[str, Any]:
-    check = dict(base_check)
+    # mutate=True lets callers that own a throwaway base_check skip the copy.
+    check = base_check if mutate else dict(base_check)
     status = str(check.get("status"))
     actual_value = check.get("actualAppUrl") if isinstance(check.get("actualAppUrl"), str) else None
     needs_config_sync = bool(check.get("needsConfigSync"))
@@ -537,7 +655,11 @@ def enrich_app_url_check(
 
 
 def build_recommendations(config: Dict[str, Any], actual_app_url: Optional[str]) -> Tuple[Dict[str, Any], List[Dict[str, Any]], Dict[str, Any]]:
-    recommended = copy.deepcopy(config)
+    # Shallow-copy only the sections this function or validate_config mutates.
+    recommended = dict(config)
+    recommended["capture"] = dict(config["capture"])
+    recommended["capture"]["allowedDomains"] = list(config["capture"].get("allowedDomains", []))
+    recommended["defaults"] = dict(config["defaults"])
     recommendations: List[Dict[str, Any]] = []
 
     app_url_check = evaluate_app_url_check(str(config["appUrl"]), actual_app_url)
@@ -563,7 +685,8 @@ def build_recommendations(config: Dict[str, Any], actual_app_url: Optional[str])
     loopback_reference = app_url_check.get("actualAppUrl") if app_url_check.get("actualAppUrl") else recommended["appUrl"]
     if is_loopback_url(str(loopback_reference)):
         allowed_domains = normalize_domains(list(recommended["capture"].get("allowedDomains", [])))
-        missing = [domain for domain in LOOPBACK_DOMAINS if domain not in allowed_domains]
+        allowed_domain_set = set(allowed_domains)
+        missing = [domain for domain in LOOPBACK_DOMAIN_ORDER if domain not in allowed_domain_set]
         if missing:
             allowed_domains.extend(missing)
             recommended["capture"]["allowedDomains"] = allowed_domains
@@ -580,12 +703,12 @@ def build_recommendations(config: Dict[str, Any], actual_app_url: Optional[str])
 
 
 def build_recommended_diff(config_path: Path, original_config: Dict[str, Any], recommended_config: Dict[str, Any]) -> str:
+    if original_config == recommended_config:
+        return ""
+
     original_text = json.dumps(original_config, indent=2, ensure_ascii=True) + "\n"
     recommended_text = json.dumps(recommended_config, indent=2, ensure_ascii=True) + "\n"
 
-    if original_text == recommended_text:
-        return ""
-
     diff = difflib.unified_diff(
         original_text.splitlines(keepends=True),
         recommended_text.splitlines(keepends=True),
@@ -619,7 +742,8 @@ def start_agent(plugin_root: Path, project_root: Path, core_port: int, debug_por
 
 
 def apply_runtime_config(core_base_url: str, config: Dict[str, Any]) -> Dict[str, Any]:
-    response = http_request("POST", f"{core_base_url}/runtime/config", payload=config, timeout=3.0)
+    body = json.dumps(config, separators=(",", ":")).encode("utf-8")
+    response = http_request("POST", f"{core_base_url}/runtime/config", body=body, timeout=3.0)
     if response.get("status") != 200:
         raise RuntimeError(
             f"Failed to apply runtime config: status={response.get('status')} body={response.get('body', '')[:500]}"
@@ -630,6 +754,7 @@ def apply_runtime_config(core_base_url: str, config: Dict[str, Any]) -> Dict[str
     return payload
 
 
+@functools.lru_cache(maxsize=1)
 def check_npx() -> Dict[str, Any]:
     npx_path = shutil.which("npx")
     if npx_path:
@@ -771,6 +896,22 @@ def run_playwright_functional_smoke(npx_path: str) -> Dict[str, Any]:
 
 
 def check_playwright_tool(npx_check: Dict[str, Any]) -> Dict[str, Any]:
+    npx_path = str(npx_check.get("path")) if npx_check.get("path") else None
+    environment = tuple(os.environ.get(key) for key in PLAYWRIGHT_CHECK_ENV_KEYS)
+    return copy.deepcopy(cached_playwright_tool_check(npx_path, bool(npx_check.get("ok")), environment))
+
+
+@functools.lru_cache(maxsize=4)
+def cached_playwright_tool_check(
+    npx_path: Optional[str],
+    npx_ok: bool,
+    environment: Tuple[Optional[str], ...],
+) -> Dict[str, Any]:
+    # `environment` only keys the cache; probes read the same variables from os.environ.
+    return probe_playwright_tool({"ok": npx_ok, "path": npx_path})
+
+
+def probe_playwright_tool(npx_check: Dict[str, Any]) -> Dict[str, Any]:
     codex_home = Path(os.environ.get("CODEX_HOME", str(Path.home() / ".codex")))
     wrapper_override = os.environ.get("PLAYWRIGHT_WRAPPER_PATH")
     wrapper_path = (
@@ -785,10 +926,7 @@ def check_playwright_tool(npx_check: Dict[str, Any]) -> Dict[str, Any]:
         "exitCode": None,
         "reason": "Playwright wrapper not found",
     }
-
-    if wrapper_exists and wrapper_executable:
-        wrapper_smoke = run_subprocess_smoke([str(wrapper_path), "--help"])
-    elif wrapper_exists:
+    if wrapper_exists and not wrapper_executable:
         wrapper_smoke = {
             "ok": False,
             "exitCode": None,
@@ -803,49 +941,65 @@ def check_playwright_tool(npx_check: Dict[str, Any]) -> Dict[str, Any]:
     npx_command: Optional[List[str]] = None
     npx_binary: Optional[str] = None
     npx_path = str(npx_check.get("path")) if npx_check.get("path") else None
-    if npx_check.get("ok") and npx_path:
-        npx_primary = [npx_path, "--yes", "--package", "@playwright/mcp", "playwright-mcp", "--help"]
-        primary_smoke = run_subprocess_smoke(npx_primary)
-        if primary_smoke.get("ok"):
-            npx_smoke = primary_smoke
-            npx_command = npx_primary
-            npx_binary = "playwright-mcp"
-        else:
-            npx_legacy = [npx_path, "--yes", "--package", "@playwright/mcp", "playwright-cli", "--help"]
-            legacy_smoke = run_subprocess_smoke(npx_legacy)
-            if legacy_smoke.get("ok"):
-                npx_smoke = dict(legacy_smoke)
-                npx_smoke["reason"] = "playwright-mcp probe failed; fallback to legacy playwright-cli succeeded"
-                npx_command = npx_legacy
-                npx_binary = "playwright-cli"
-            else:
-                reasons: List[str] = []
-                if isinstance(primary_smoke.get("reason"), str):
-                    reasons.append(f"playwright-mcp: {primary_smoke['reason']}")
-                if isinstance(legacy_smoke.get("reason"), str):
-                    reasons.append(f"playwright-cli: {legacy_smoke['reason']}")
-                npx_smoke = {
-                    "ok": False,
-                    "exitCode": (
-                        legacy_smoke.get("exitCode")
-                        if legacy_smoke.get("exitCode") is not None
-                        else primary_smoke.get("exitCode")
-                    ),
-                    "reason": "; ".join(reasons) if reasons else "npx probe failed",
-                }
+    npx_available = bool(npx_check.get("ok")) and bool(npx_path)
+    functional_smoke: Dict[str, Any] = {
+        "ok": False,
+        "skipped": True,
+        "reason": "functional smoke skipped because npx command is unavailable",
+        "command": None,
+        "exitCode": None,
+    }
+
+    # The functional smoke (npx --package playwright) only overlaps the wrapper check. It is
+    # joined before the npx CLI probes start, so two npx installs never race on the same npm
+    # cache; the legacy playwright-cli probe in turn only runs after the primary probe fails.
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        functional_future = executor.submit(run_playwright_functional_smoke, npx_path) if npx_available else None
+        if wrapper_exists and wrapper_executable:
+            wrapper_smoke = run_subprocess_smoke([str(wrapper_path), "--help"])
+
+        if functional_future is not None:
+            functional_smoke = functional_future.result()
+
+        if wrapper_smoke.get("ok"):
+            npx_smoke = {
+                "ok": False,
+                "skipped": True,
+                "exitCode": None,
+                "reason": "npx probe skipped because Playwright wrapper smoke check passed",
+            }
+        elif npx_available:
+            npx_primary = [npx_path, "--yes", "--package", "@playwright/mcp", "playwright-mcp", "--help"]
+            primary_smoke = run_subprocess_smoke(npx_primary)
+            if primary_smoke.get("ok"):
+                npx_smoke = primary_smoke
                 npx_command = npx_primary
+                npx_binary = "playwright-mcp"
+            else:
+                npx_legacy = [npx_path, "--yes", "--package", "@playwright/mcp", "playwright-cli", "--help"]
+                legacy_smoke = run_subprocess_smoke(npx_legacy)
+                if legacy_smoke.get("ok"):
+                    npx_smoke = dict(legacy_smoke)
+                    npx_smoke["reason"] = "playwright-mcp probe failed; fallback to legacy playwright-cli succeeded"
+                    npx_command = npx_legacy
+                    npx_binary = "playwright-cli"
+                else:
+                    reasons: List[str] = []
+                    if isinstance(primary_smoke.get("reason"), str):
+                        reasons.append(f"playwright-mcp: {primary_smoke['reason']}")
+                    if isinstance(legacy_smoke.get("reason"), str):
+                        reasons.append(f"playwright-cli: {legacy_smoke['reason']}")
+                    npx_smoke = {
+                        "ok": False,
+                        "exitCode": (
+                            legacy_smoke.get("exitCode")
+                            if legacy_smoke.get("exitCode") is not None
+                            else primary_smoke.get("exitCode")
+                        ),
+                        "reason": "; ".join(reasons) if reasons else "npx probe failed",
+                    }
+                    npx_command = npx_primary
 
-    functional_smoke: Dict[str, Any]
-    if npx_check.get("ok") and npx_path:
-        functional_smoke = run_playwright_functional_smoke(npx_path)
-    else:
-        functional_smoke = {
-            "ok": False,
-            "skipped": True,
-            "reason": "functional smoke skipped because npx command is unavailable",
-            "command": None,
-            "exitCode": None,
-        }
     functional_ok = bool(functional_smoke.get("ok")) or bool(functional_smoke.get("skipped"))
 
     if wrapper_smoke.get("ok"):
@@ -989,7 +1143,7 @@ def probe_preflight(debug_endpoint: str, origin: str) -> Dict[str, Any]:
         timeout=1.5,
     )
 
-    allow_origin = str(response.get("headers", {}).get("access-control-allow-origin", ""))
+    allow_origin = str((response.get("headers") or {}).get("access-control-allow-origin", ""))
     status = response.get("status")
     ok = status == 204 and allow_origin == origin
 
@@ -1011,14 +1165,19 @@ def probe_preflight(debug_endpoint: str, origin: str) -> Dict[str, Any]:
     }
 
 
-def probe_debug_post(debug_endpoint: str, origin: str, issue_tag: str) -> Dict[str, Any]:
+def probe_debug_post(
+    debug_endpoint: str,
+    origin: str,
+    issue_tag: str,
+    now: Optional[datetime] = None,
+) -> Dict[str, Any]:
     trace_id = str(uuid.uuid4())
     payload = {
         "marker": "BUGFIX_TRACE",
         "tag": issue_tag,
         "event": "bootstrap-probe",
         "traceId": trace_id,
-        "ts": iso_now(),
+        "ts": format_iso(now) if now else iso_now(),
         "data": {
             "source": "bootstrap",
             "origin": origin,
@@ -1057,9 +1216,15 @@ def probe_debug_post(debug_endpoint: str, origin: str, issue_tag: str) -> Dict[s
     }
 
 
-def probe_query(query_endpoint: str, trace_id: str, tag: str) -> Dict[str, Any]:
-    from_ts = (datetime.now(timezone.utc) - timedelta(minutes=2)).isoformat().replace("+00:00", "Z")
-    to_ts = (datetime.now(timezone.utc) + timedelta(minutes=2)).isoformat().replace("+00:00", "Z")
+def probe_query(
+    query_endpoint: str,
+    trace_id: str,
+    tag: str,
+    now: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    now = now or datetime.now(timezone.utc)
+    from_ts = (now - timedelta(minutes=2)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    to_ts = (now + timedelta(minutes=2)).strftime("%Y-%m-%dT%H:%M:%SZ")
     params = urlencode(
         {
             "from": from_ts,
@@ -1070,10 +1235,19 @@ def probe_query(query_endpoint: str, trace_id: str, tag: str) -> Dict[str, Any]:
         }
     )
     url = f"{query_endpoint}?{params}"
+    # The first attempt long-polls on agents that support waitMs; older agents
+    # ignore the parameter and the short retry loop below still applies.
+    long_poll_url = f"{url}&{urlencode({'waitMs': QUERY_PROBE_WAIT_MS})}"
 
     last_status: Optional[int] = None
-    for attempt in range(1, 4):
-        response = http_request("GET", url, timeout=2.0)
+    unavailable_reason: Optional[str] = None
+    attempt = 0
+    while attempt < QUERY_PROBE_MAX_ATTEMPTS:
+        attempt += 1
+        if attempt == 1:
+            response = http_request("GET", long_poll_url, timeout=2.0 + QUERY_PROBE_WAIT_MS / 1000)
+        else:
+            response = http_request("GET", url, timeout=2.0)
         status = response.get("status")
         if isinstance(status, int):
             last_status = status
@@ -1102,23 +1276,66 @@ def probe_query(query_endpoint: str, trace_id: str, tag: str) -> Dict[str, Any]:
                         "reason": None,
                     }
 
-        if attempt < 3:
-            time.sleep(0.2)
+        if status is None and check_endpoint_unavailable({"status": None, "reason": response.get("error")}):
+            # Retrying an unreachable endpoint cannot succeed within the probe window.
+            unavailable_reason = str(response.get("error"))
+            break
+
+        if attempt < QUERY_PROBE_MAX_ATTEMPTS:
+            delay = min(QUERY_PROBE_BASE_DELAY_SECONDS * (2 ** (attempt - 1)), QUERY_PROBE_MAX_DELAY_SECONDS)
+            time.sleep(delay + random.uniform(0, QUERY_PROBE_JITTER_SECONDS))
+
+    if unavailable_reason is not None and last_status is None:
+        reason = unavailable_reason
+    elif isinstance(last_status, int) and last_status != 200:
+        reason = f"expected HTTP 200 from query endpoint, got {last_status}"
+    else:
+        reason = "probe event not found in query window"
 
     return {
         "ok": False,
         "status": last_status,
         "matchedTraceId": trace_id,
         "matchedTag": tag,
-        "attempt": 3,
-        "reason": (
-            f"expected HTTP 200 from query endpoint, got {last_status}"
-            if isinstance(last_status, int) and last_status != 200
-            else "probe event not found in query window"
-        ),
+        "attempt": attempt,
+        "reason": reason,
     }
 
 
+def probe_debug_round_trip(
+    debug_endpoint: str,
+    query_endpoint: str,
+    origin: str,
+    issue_tag: str,
+    now: Optional[datetime] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    # One clock read covers both the posted event and the query window around it.
+    now = now or datetime.now(timezone.utc)
+    debug_post_check = probe_debug_post(debug_endpoint, origin, issue_tag, now=now)
+    if not debug_post_check["ok"]:
+        return debug_post_check, {
+            "ok": False,
+            "status": None,
+            "matchedTraceId": None,
+            "matchedTag": None,
+            "attempt": 0,
+            "reason": "skipped because debugPost failed",
+        }
+
+    query_check = probe_query(
+        query_endpoint,
+        trace_id=str(debug_post_check["traceId"]),
+        tag=str(debug_post_check["tag"]),
+        now=now,
+    )
+    return debug_post_check, query_check
+
+
+def check_npx_and_playwright() -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    npx_check = check_npx()
+    return npx_check, check_playwright_tool(npx_check)
+
+
 def build_headed_evidence_check(cdp_check: Dict[str, Any]) -> Dict[str, Any]:
     if not bool(cdp_check.get("ok")):
         return {
@@ -1149,26 +1366,16 @@ def check_endpoint_unavailable(check: Dict[str, Any]) -> bool:
     status = check.get("status")
     if status is None:
         reason = check.get("reason")
-        reason_text = str(reason).lower() if isinstance(reason, str) else ""
-        keywords = [
-            "connection",
-            "refused",
-            "timed out",
-            "timeout",
-            "unreachable",
-            "name or service not known",
-            "nodename nor servname provided",
-        ]
-        return any(keyword in reason_text for keyword in keywords)
+        return isinstance(reason, str) and ENDPOINT_UNAVAILABLE_PATTERN.search(reason) is not None
     return isinstance(status, int) and status >= 500
 
 
+def check_status(check: Any) -> Any:
+    return check.get("status") if type(check) is dict else None
+
+
 def classify_instrumentation_failure(checks: Dict[str, Any]) -> Dict[str, Any]:
-    failed_checks = [
-        name
-        for name in ["appUrl", "preflight", "debugPost", "query"]
-        if not bool(checks.get(name, {}).get("ok"))
-    ]
+    failed_checks = [name for name in INSTRUMENTATION_CHECK_NAMES if not (checks.get(name) or EMPTY_CHECK).get("ok")]
 
     if not failed_checks:
         return {
@@ -1177,16 +1384,14 @@ def classify_instrumentation_failure(checks: Dict[str, Any]) -> Dict[str, Any]:
             "reason": None,
         }
 
-    app_url_check = checks.get("appUrl", {})
-    app_status = str(app_url_check.get("status")) if isinstance(app_url_check, dict) else ""
-    preflight_check = checks.get("preflight", {})
-    debug_post_check = checks.get("debugPost", {})
-    query_check = checks.get("query", {})
+    app_url_check = checks.get("appUrl", EMPTY_CHECK)
+    app_status = str(app_url_check.get("status")) if type(app_url_check) is dict else ""
+    preflight_check = checks.get("preflight", EMPTY_CHECK)
+    debug_post_check = checks.get("debugPost", EMPTY_CHECK)
+    query_check = checks.get("query", EMPTY_CHECK)
 
     if app_status == "mismatch":
-        preflight_blocked = isinstance(preflight_check, dict) and preflight_check.get("status") == 403
-        debug_blocked = isinstance(debug_post_check, dict) and debug_post_check.get("status") == 403
-        if preflight_blocked or debug_blocked:
+        if check_status(preflight_check) == 403 or check_status(debug_post_check) == 403:
             return {
                 "failedChecks": failed_checks,
                 "category": "network-mismatch-only",
@@ -1198,8 +1403,8 @@ def classify_instrumentation_failure(checks: Dict[str, Any]) -> Dict[str, Any]:
 
     endpoint_unavailable = any(
         check_endpoint_unavailable(candidate)
-        for candidate in [preflight_check, debug_post_check, query_check]
-        if isinstance(candidate, dict)
+        for candidate in (preflight_check, debug_post_check, query_check)
+        if type(candidate) is dict
     )
     if endpoint_unavailable:
         return {
@@ -1291,18 +1496,15 @@ def bootstrap(
     plugin_root = resolve_plugin_root(plugin_root_arg)
     project_config_path, raw_config, _created = ensure_project_config(project_root)
     config = validate_config(raw_config)
-    original_config = copy.deepcopy(config)
 
+    # build_recommendations never mutates config, so it doubles as the diff baseline.
     recommended_config, recommendations, app_url_check = build_recommendations(config, actual_app_url)
-    recommended_diff = build_recommended_diff(project_config_path, original_config, recommended_config)
+    recommended_diff = build_recommended_diff(project_config_path, config, recommended_config)
 
     active_config = config
     applied_recommendations = False
     if apply_recommended and recommendations:
-        project_config_path.write_text(
-            json.dumps(recommended_config, indent=2, ensure_ascii=True) + "\n",
-            encoding="utf-8",
-        )
+        write_project_config(project_config_path, recommended_config)
         active_config = recommended_config
         applied_recommendations = True
     elif recommendations:
@@ -1355,38 +1557,38 @@ def bootstrap(
         recommended_actual_app_url=recommended_actual_app_url,
         has_recommendations=bool(recommendations),
         applied_recommendations=applied_recommendations,
+        mutate=True,
     )
     instrumentation_origin = get_origin(
         app_url_check["actualAppUrl"] if isinstance(app_url_check.get("actualAppUrl"), str) else effective_app_url
     )
 
-    preflight_check = probe_preflight(debug_endpoint, instrumentation_origin)
-
+    # Probes are independent network/subprocess round-trips; overlap them so the
+    # bootstrap costs roughly the slowest probe rather than the sum.
     issue_tag = "bootstrap-probe"
-    debug_post_check = probe_debug_post(debug_endpoint, instrumentation_origin, issue_tag)
-
-    if debug_post_check["ok"]:
-        query_check = probe_query(
+    probe_started_at = datetime.now(timezone.utc)
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        preflight_future = executor.submit(probe_preflight, debug_endpoint, instrumentation_origin)
+        debug_round_trip_future = executor.submit(
+            probe_debug_round_trip,
+            debug_endpoint,
             query_endpoint,
-            trace_id=str(debug_post_check["traceId"]),
-            tag=str(debug_post_check["tag"]),
+            instrumentation_origin,
+            issue_tag,
+            probe_started_at,
         )
-    else:
-        query_check = {
-            "ok": False,
-            "status": None,
-            "matchedTraceId": None,
-            "matchedTag": None,
-            "attempt": 0,
-            "reason": "skipped because debugPost failed",
-        }
+        tools_future = executor.submit(check_npx_and_playwright)
+        cdp_future = executor.submit(probe_cdp, cdp_port)
+        command_probe_future = executor.submit(probe_command_endpoint, core_base_url)
+
+        preflight_check = preflight_future.result()
+        debug_post_check, query_check = debug_round_trip_future.result()
+        npx_check, playwright_check = tools_future.result()
+        cdp_check = cdp_future.result()
+        command_probe_check = command_probe_future.result()
 
-    npx_check = check_npx()
-    playwright_check = check_playwright_tool(npx_check)
-    cdp_check = probe_cdp(cdp_port)
     headed_evidence_check = build_headed_evidence_check(cdp_check)
     core_health_check = build_core_health_check(core_base_url, health_after_config)
-    command_probe_check = probe_command_endpoint(core_base_url)
     session_summary = build_session_summary(health_after_config)
 
     checks: Dict[str, Any] = {
@@ -1404,23 +1606,22 @@ def bootstrap(
         },
     }
 
-    warnings: List[Dict[str, str]] = []
-    if isinstance(headed_evidence_check.get("warning"), str) and headed_evidence_check["warning"]:
-        warnings.append(
+    # Allocate checks["warnings"] only when there is something to report.
+    headed_warning = headed_evidence_check.get("warning")
+    if isinstance(headed_warning, str) and headed_warning:
+        checks["warnings"] = [
             {
                 "id": "headed-evidence-required",
-                "message": str(headed_evidence_check["warning"]),
+                "message": headed_warning,
             }
-        )
-    if not bool(command_probe_check.get("ok")):
-        warnings.append(
+        ]
+    if not command_probe_check.get("ok"):
+        checks.setdefault("warnings", []).append(
             {
                 "id": "command-endpoint-unverified",
                 "message": "Core /command probe failed; command endpoint may be unstable.",
             }
         )
-    if warnings:
-        checks["warnings"] = warnings
 
     instrumentation_failure = classify_instrumentation_failure(checks)
     failed_checks = instrumentation_failure["failedChecks"]
@@ -1496,7 +1697,9 @@ def main() -> int:
         return 1
 
     if args.json:
-        print(json.dumps(result, ensure_ascii=True))
+        json.dump(result, sys.stdout, ensure_ascii=True, separators=(",", ":"))
+        sys.stdout.write("\n")
+        sys.stdout.flush()
     else:
         print("Browser Debug bootstrap complete")
         for key in [
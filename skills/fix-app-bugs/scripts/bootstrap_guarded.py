@@ -9,42 +9,53 @@ machine-readable terminal-probe fallback payload and exits 0.
 from __future__ import annotations
 
 import argparse
+import functools
+import importlib.util
 import json
 import os
 import subprocess
 import sys
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+SCRIPT_DIR = Path(__file__).resolve().parent
+SIBLING_BOOTSTRAP_SCRIPT = SCRIPT_DIR / "bootstrap_browser_debug.py"
 
-def unique_paths(paths: List[Path]) -> List[Path]:
+
+def unique_paths(paths: List[Path]) -> List[Tuple[Path, bool]]:
+    # Returns each unique path with its exists() result so callers do not stat again.
     seen = set()
-    result: List[Path] = []
+    result: List[Tuple[Path, bool]] = []
     for path in paths:
-        key = str(path.resolve()) if path.exists() else str(path)
+        exists = path.exists()
+        key = str(path.resolve()) if exists else str(path)
         if key in seen:
             continue
         seen.add(key)
-        result.append(path)
+        result.append((path, exists))
     return result
 
 
-def resolve_bootstrap_candidates(override: Optional[str]) -> List[Path]:
-    script_dir = Path(__file__).resolve().parent
-    codex_home = Path(os.environ.get("CODEX_HOME", str(Path.home() / ".codex"))).expanduser()
+@functools.lru_cache(maxsize=4)
+def resolve_codex_homes(codex_home_env: Optional[str], home_env: Optional[str]) -> Tuple[Path, Path]:
+    # Keyed on the raw env values so a changed CODEX_HOME/HOME is still honored.
+    default_codex_home = Path.home() / ".codex"
+    codex_home = Path(codex_home_env).expanduser() if codex_home_env is not None else default_codex_home
+    return codex_home, default_codex_home
+
 
+def resolve_bootstrap_candidates(override: Optional[str]) -> List[Tuple[Path, bool]]:
     if override:
         # Explicit override is treated as authoritative (used by tests/custom setups).
-        return [Path(override).expanduser()]
-
-    candidates: List[Path] = []
-    candidates.extend(
-        [
-            script_dir / "bootstrap_browser_debug.py",
-            codex_home / "skills" / "fix-app-bugs" / "scripts" / "bootstrap_browser_debug.py",
-            Path.home() / ".codex" / "skills" / "fix-app-bugs" / "scripts" / "bootstrap_browser_debug.py",
-        ]
-    )
+        override_path = Path(override).expanduser()
+        return [(override_path, override_path.exists())]
+
+    codex_home, default_codex_home = resolve_codex_homes(os.environ.get("CODEX_HOME"), os.environ.get("HOME"))
+    candidates: List[Path] = [
+        SIBLING_BOOTSTRAP_SCRIPT,
+        codex_home / "skills" / "fix-app-bugs" / "scripts" / "bootstrap_browser_debug.py",
+        default_codex_home / "skills" / "fix-app-bugs" / "scripts" / "bootstrap_browser_debug.py",
+    ]
     return unique_paths(candidates)
 
 
@@ -88,62 +99,69 @@ def fallback_payload(project_root: str, reason: str, script_path: Optional[Path]
     }
 
 
+def str_or_none(value: Any) -> Optional[str]:
+    return value if type(value) is str else None
+
+
 def enrich_success_payload(payload: Dict[str, Any], script_path: Path) -> Dict[str, Any]:
-    result = dict(payload)
-    browser = result.get("browserInstrumentation")
-    if not isinstance(browser, dict):
+    # Normalize into locals first and assemble each nested dict exactly once.
+    browser = payload.get("browserInstrumentation")
+    if type(browser) is not dict:
         browser = {}
     can_instrument = bool(browser.get("canInstrumentFromBrowser"))
     mode = browser.get("mode")
-    if not isinstance(mode, str) or not mode:
+    if type(mode) is not str or not mode:
         mode = "browser-fetch" if can_instrument else "terminal-probe"
     reason = browser.get("reason")
-    if reason is not None and not isinstance(reason, str):
+    if reason is not None and type(reason) is not str:
         reason = str(reason)
-    browser["canInstrumentFromBrowser"] = can_instrument
-    browser["mode"] = mode
-    browser["reason"] = reason
-    result["browserInstrumentation"] = browser
 
-    session = result.get("session")
-    if not isinstance(session, dict):
+    session = payload.get("session")
+    if type(session) is not dict:
         session = {}
-    session["active"] = bool(session.get("active"))
-    session["sessionId"] = session.get("sessionId") if isinstance(session.get("sessionId"), str) else None
-    session["tabUrl"] = session.get("tabUrl") if isinstance(session.get("tabUrl"), str) else None
-    session["state"] = session.get("state") if isinstance(session.get("state"), str) else None
-    result["session"] = session
+    session_active = bool(session.get("active"))
+    session_state = str_or_none(session.get("state"))
 
-    readiness_reasons_raw = result.get("readinessReasons")
+    readiness_reasons_raw = payload.get("readinessReasons")
     readiness_reasons: List[str] = []
-    if isinstance(readiness_reasons_raw, list):
+    if type(readiness_reasons_raw) is list:
         for item in readiness_reasons_raw:
-            if isinstance(item, str) and item.strip():
-                readiness_reasons.append(item.strip())
-
-    ready_from_payload = result.get("readyForScenarioRun")
-    ready_for_scenario: bool
-    if isinstance(ready_from_payload, bool):
-        ready_for_scenario = ready_from_payload
-    else:
-        mode_value = mode.strip().lower() if isinstance(mode, str) else None
-        if not readiness_reasons and not can_instrument and mode_value in {None, "browser-fetch"}:
+            if type(item) is str:
+                item = item.strip()
+                if item:
+                    readiness_reasons.append(item)
+
+    ready_for_scenario = payload.get("readyForScenarioRun")
+    if type(ready_for_scenario) is not bool:
+        if not readiness_reasons and not can_instrument and mode.strip().lower() == "browser-fetch":
             failure_category = browser.get("failureCategory")
-            if isinstance(failure_category, str) and failure_category:
+            if type(failure_category) is str and failure_category:
                 readiness_reasons.append(f"instrumentation-gate:{failure_category}")
             else:
                 readiness_reasons.append("instrumentation-gate:failed")
-        if bool(session.get("active")):
-            session_state = session.get("state")
-            normalized_state = session_state.strip().lower() if isinstance(session_state, str) else "unknown"
+        if session_active:
+            normalized_state = session_state.strip().lower() if session_state is not None else "unknown"
             if normalized_state != "running":
                 readiness_reasons.append(f"session-state:{normalized_state}")
-        ready_for_scenario = len(readiness_reasons) == 0
+        ready_for_scenario = not readiness_reasons
 
+    result = dict(payload)
+    result["browserInstrumentation"] = {
+        **browser,
+        "canInstrumentFromBrowser": can_instrument,
+        "mode": mode,
+        "reason": reason,
+        "readyForScenarioRun": ready_for_scenario,
+    }
+    result["session"] = {
+        **session,
+        "active": session_active,
+        "sessionId": str_or_none(session.get("sessionId")),
+        "tabUrl": str_or_none(session.get("tabUrl")),
+        "state": session_state,
+    }
     result["readyForScenarioRun"] = ready_for_scenario
     result["readinessReasons"] = readiness_reasons
-    browser["readyForScenarioRun"] = ready_for_scenario
-
     result["bootstrap"] = {
         "status": "ok",
         "reason": None,
@@ -165,31 +183,28 @@ def run_bootstrap(
         cmd.append("--apply-recommended")
 
     try:
-        completed = subprocess.run(
-            cmd,
-            check=False,
-            capture_output=True,
-            text=True,
-        )
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        stdout_bytes, stderr_bytes = process.communicate()
     except OSError as exc:
         return fallback_payload(project_root, f"bootstrap launch failed: {exc}", script_path)
 
-    if completed.returncode != 0:
-        stderr = completed.stderr.strip()
+    if process.returncode != 0:
+        stderr = stderr_bytes.decode("utf-8", errors="replace").strip()
         reason = (
-            f"bootstrap returned non-zero exit code {completed.returncode}: {stderr}"
+            f"bootstrap returned non-zero exit code {process.returncode}: {stderr}"
             if stderr
-            else f"bootstrap returned non-zero exit code {completed.returncode}"
+            else f"bootstrap returned non-zero exit code {process.returncode}"
         )
         return fallback_payload(project_root, reason, script_path)
 
-    stdout = completed.stdout.strip()
+    # json.loads accepts bytes directly, so stdout skips the text-mode decode.
+    stdout = stdout_bytes.strip()
     if not stdout:
         return fallback_payload(project_root, "bootstrap produced empty stdout", script_path)
 
     try:
         payload = json.loads(stdout)
-    except json.JSONDecodeError as exc:
+    except (json.JSONDecodeError, UnicodeDecodeError) as exc:
         return fallback_payload(project_root, f"bootstrap emitted invalid JSON: {exc}", script_path)
 
     if not isinstance(payload, dict):
@@ -198,6 +213,35 @@ def run_bootstrap(
     return enrich_success_payload(payload, script_path)
 
 
+def run_bootstrap_in_process(
+    script_path: Path,
+    project_root: str,
+    actual_app_url: Optional[str],
+    apply_recommended: bool,
+) -> Dict[str, Any]:
+    # Co-located bootstrap script: call it directly instead of paying for an
+    # interpreter launch plus a JSON serialize/parse round-trip.
+    try:
+        spec = importlib.util.spec_from_file_location("bootstrap_browser_debug", script_path)
+        if spec is None or spec.loader is None:
+            return fallback_payload(project_root, f"bootstrap module could not be loaded: {script_path}", script_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        payload = module.bootstrap(
+            Path(project_root).expanduser().resolve(),
+            None,
+            actual_app_url,
+            apply_recommended,
+        )
+    except Exception as exc:  # noqa: BLE001
+        return fallback_payload(project_root, f"bootstrap failed: {exc}", script_path)
+
+    if not isinstance(payload, dict):
+        return fallback_payload(project_root, "bootstrap payload is not an object", script_path)
+
+    return enrich_success_payload(payload, script_path)
+
+
 def bootstrap_guarded(
     project_root: str,
     actual_app_url: Optional[str],
@@ -206,14 +250,17 @@ def bootstrap_guarded(
 ) -> Dict[str, Any]:
     candidates = resolve_bootstrap_candidates(bootstrap_script)
     selected: Optional[Path] = None
-    for candidate in candidates:
-        if candidate.exists():
+    for candidate, exists in candidates:
+        if exists:
             selected = candidate
             break
 
     if selected is None:
-        reason = f"bootstrap script not found in candidates: {', '.join(str(path) for path in candidates)}"
-        return fallback_payload(project_root, reason, candidates[0] if candidates else None)
+        reason = f"bootstrap script not found in candidates: {', '.join(str(path) for path, _ in candidates)}"
+        return fallback_payload(project_root, reason, candidates[0][0] if candidates else None)
+
+    if bootstrap_script is None and selected == SIBLING_BOOTSTRAP_SCRIPT:
+        return run_bootstrap_in_process(selected, project_root, actual_app_url, apply_recommended)
 
     return run_bootstrap(selected, project_root, actual_app_url, apply_recommended)
 
@@ -243,7 +290,8 @@ def main() -> int:
     )
 
     if args.json:
-        print(json.dumps(payload, ensure_ascii=True))
+        json.dump(payload, sys.stdout, ensure_ascii=True, separators=(",", ":"))
+        sys.stdout.write("\n")
     else:
         bootstrap_meta = payload.get("bootstrap", {})
         browser = payload.get("browserInstrumentation", {})
@@ -255,7 +303,9 @@ def main() -> int:
             f"- browserInstrumentation.canInstrumentFromBrowser: "
             f"{browser.get('canInstrumentFromBrowser')}"
         )
-        print(json.dumps(payload, ensure_ascii=True))
+        json.dump(payload, sys.stdout, ensure_ascii=True)
+        sys.stdout.write("\n")
+    sys.stdout.flush()
 
     return 0
 
@@ -0,0 +1,107 @@
+"""Keep-alive HTTP connection pool shared by the fix-app-bugs scripts.
+
+Core API and CDP calls repeatedly hit the same one or two loopback origins, so
+sockets are parked per origin instead of reconnecting for every request.
+"""
+
+from __future__ import annotations
+
+import select
+import threading
+from http.client import HTTPConnection, HTTPMessage, HTTPSConnection
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+def connection_dropped(connection: HTTPConnection) -> bool:
+    if connection.sock is None:
+        return False
+    try:
+        readable, _, _ = select.select([connection.sock], [], [], 0)
+    except (OSError, ValueError):
+        return True
+    # An idle keep-alive socket only turns readable once the server closed it (or sent junk).
+    return bool(readable)
+
+
+class KeepAliveConnectionPool:
+    def __init__(self, max_idle_per_origin: int = 2) -> None:
+        self.max_idle_per_origin = max_idle_per_origin
+        self.idle: Dict[Tuple[str, str], List[HTTPConnection]] = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, key: Tuple[str, str], timeout: float) -> Tuple[HTTPConnection, bool]:
+        while True:
+            with self.lock:
+                idle = self.idle.get(key)
+                connection = idle.pop() if idle else None
+            if connection is None:
+                break
+            if connection_dropped(connection):
+                connection.close()
+                continue
+            connection.timeout = timeout
+            if connection.sock is not None:
+                connection.sock.settimeout(timeout)
+            return connection, True
+
+        scheme, netloc = key
+        connection_class = HTTPSConnection if scheme == "https" else HTTPConnection
+        return connection_class(netloc, timeout=timeout), False
+
+    def release(self, key: Tuple[str, str], connection: HTTPConnection) -> None:
+        with self.lock:
+            idle = self.idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_origin:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes],
+        headers: Dict[str, str],
+        timeout: float,
+    ) -> Tuple[int, str, HTTPMessage, bytes]:
+        parsed = urlsplit(url)
+        if parsed.scheme not in {"http", "https"} or not parsed.netloc:
+            raise ValueError(f"unknown url type: {url!r}")
+        key = (parsed.scheme, parsed.netloc)
+        target = parsed.path or "/"
+        if parsed.query:
+            target = f"{target}?{parsed.query}"
+
+        while True:
+            connection, reused = self.acquire(key, timeout)
+            request_sent = False
+            try:
+                connection.request(method, target, body=body, headers=headers)
+                request_sent = True
+                response = connection.getresponse()
+                raw_body = response.read()
+            except ConnectionError:
+                connection.close()
+                if reused and not request_sent:
+                    # The server closed the idle socket before the request got through; a
+                    # fresh socket cannot double-apply it. Once sent, it may already have run
+                    # (navigate, click, type), so the error is surfaced instead of replayed.
+                    continue
+                raise
+            except BaseException:
+                connection.close()
+                raise
+
+            if response.will_close:
+                connection.close()
+            else:
+                self.release(key, connection)
+            return response.status, response.reason, response.headers, raw_body
+
+    def clear(self) -> None:
+        with self.lock:
+            idle_connections = [connection for idle in self.idle.values() for connection in idle]
+            self.idle.clear()
+        for connection in idle_connections:
+            connection.close()
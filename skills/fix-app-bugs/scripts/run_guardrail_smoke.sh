@@ -3,6 +3,7 @@ set -euo pipefail
 
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 
+python3 "$SCRIPT_DIR/test_http_keep_alive.py"
 python3 "$SCRIPT_DIR/test_bootstrap_guarded.py"
 python3 "$SCRIPT_DIR/test_bootstrap_browser_debug.py"
 python3 "$SCRIPT_DIR/test_terminal_probe_pipeline.py"
@@ -11,25 +11,67 @@ captures snapshots, computes visual metrics, and writes a standard artifact bund
 from __future__ import annotations
 
 import argparse
+import atexit
+import functools
+import hashlib
 import json
+import mmap
+import operator
 import os
+import random
 import re
 import shutil
 import subprocess
+import struct
 import sys
 import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timezone
+from http.client import HTTPException
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
-from urllib.error import HTTPError, URLError
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
 from urllib.parse import quote, urlparse
-from urllib.request import Request, urlopen
+
+# Sibling helper modules ship in this directory; make them importable however the script was loaded.
+SCRIPT_DIR = Path(__file__).resolve().parent
+if str(SCRIPT_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPT_DIR))
+
+from http_keep_alive import KeepAliveConnectionPool  # noqa: E402
+
+# Optional fast path for screenshot metrics; ImageMagick remains the stdlib-only fallback.
+try:
+    import numpy
+    from PIL import Image
+except ImportError:
+    numpy = None
+    Image = None
+
+# Pillow reports oversized and malformed images with more than OSError (DecompressionBombError,
+# SyntaxError and struct.error from plugin header parsers, EOFError from truncated frames);
+# any of them hands the image to ImageMagick instead of failing the run.
+IMAGE_DECODE_ERRORS: Tuple[type, ...] = (OSError, ValueError, SyntaxError, EOFError, struct.error, zlib.error)
+if Image is not None:
+    IMAGE_DECODE_ERRORS += (Image.DecompressionBombError,)
 
 DEFAULT_CORE_BASE_URL = "http://127.0.0.1:4678"
 BODY_SNIPPET_LIMIT = 600
 SESSION_ENSURE_RETRY_LIMIT = 3
+SESSION_BACKOFF_BASE_SECONDS = 0.1
+SESSION_BACKOFF_CAP_SECONDS = 2.0
 DEFAULT_TAB_URL_MATCH_STRATEGY = "origin-path"
 DEFAULT_RESIZE_INTERPOLATION = "bilinear"
+IMAGE_METRICS_WORKERS = 2
+# Rows converted to float per step, so full-page shots never need a whole-image array.
+IMAGE_METRICS_STRIP_ROWS = 256
+# ImageMagick's default -colorspace Gray intensity (Rec709Luma), applied to sRGB values.
+REC709_LUMA_WEIGHTS = (0.212656, 0.715158, 0.072186)
+# JPEG start-of-frame markers carrying image size (DHT, JPG and DAC share the range).
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+RESULT_CACHE_MAX_ENTRIES = 256
+# Bump whenever the metric formulas change so cached results from older code are ignored.
+IMAGE_METRICS_CACHE_VERSION = 2
 
 PIPELINE_RETRY_BASE_COMMAND = (
     "python3 \"${CODEX_HOME:-$HOME/.codex}/skills/fix-app-bugs/scripts/terminal_probe_pipeline.py\" "
@@ -58,6 +100,124 @@ STALE_TRANSPORT_HINTS = [
     "socket hang up",
     "econnreset",
 ]
+STALE_TRANSPORT_PATTERN = re.compile("|".join(re.escape(hint) for hint in STALE_TRANSPORT_HINTS), re.IGNORECASE)
+NAVIGATE_ONCE_FAILURE_PATTERN = re.compile(r"page\.once is not a function|client\.page\.once", re.IGNORECASE)
+TOOLING_ERROR_CODES = frozenset(
+    {
+        "CDP_UNAVAILABLE",
+        "SESSION_NOT_FOUND",
+        "TARGET_NOT_FOUND",
+        "SESSION_ALREADY_RUNNING",
+        "COMMAND_TIMEOUT",
+        "VALIDATION_ERROR",
+        "AMBIGUOUS_TARGET",
+        "IMAGE_DIMENSION_MISMATCH",
+        "FILE_NOT_FOUND",
+        "UNSUPPORTED_IMAGE_FORMAT",
+    }
+)
+RENDER_ERROR_HINTS = ["webgl", "shader", "render", "canvas", "context lost"]
+RENDER_ERROR_PATTERN = re.compile("|".join(re.escape(hint) for hint in RENDER_ERROR_HINTS), re.IGNORECASE)
+SECRET_FIELD_PATTERN = re.compile(
+    r'("?(?:token|secret|password|authorization|cookie)"?\s*:\s*")[^"]*(")',
+    re.IGNORECASE,
+)
+BEARER_TOKEN_PATTERN = re.compile(r"(bearer\s+)[A-Za-z0-9\-._~+/]+=*", re.IGNORECASE)
+SENSITIVE_KEYWORDS = ("token", "secret", "password", "authorization", "cookie", "bearer")
+
+# Request bodies are machine-read only; a shared compact encoder skips per-call
+# encoder setup and the padding bytes of the default separators.
+COMPACT_JSON_ENCODER = json.JSONEncoder(separators=(",", ":"))
+ARTIFACT_JSON_ENCODER = json.JSONEncoder(indent=2, ensure_ascii=False)
+ARTIFACT_ASCII_JSON_ENCODER = json.JSONEncoder(indent=2, ensure_ascii=True)
+
+
+# Ordered by precedence: when an error code and a failure category map to different
+# entries, build_failure_next_action picks the one listed first.
+NEXT_ACTION_TEMPLATES: Dict[str, Dict[str, Any]] = {
+    "TARGET_NOT_FOUND": {
+        "id": "open-tab-recovery",
+        "label": "Open missing tab and retry",
+        "reason": "Target tab was not found while ensuring session.",
+        "command": PIPELINE_RETRY_FORCE_RECOVERY_COMMAND,
+    },
+    "SESSION_ALREADY_RUNNING": {
+        "id": "replace-active-session",
+        "label": "Replace active session",
+        "reason": "Active session conflict blocked ensure/reuse flow.",
+        "command": SESSION_RESTART_COMMAND,
+    },
+    "CDP_UNAVAILABLE": {
+        "id": "recover-cdp-session",
+        "label": "Recover CDP and session",
+        "reason": "CDP endpoint/session channel is unavailable.",
+        "command": VISUAL_START_RECOVERY_COMMAND,
+    },
+    "AMBIGUOUS_TARGET": {
+        "id": "use-exact-target",
+        "label": "Use exact target match",
+        "reason": "Multiple tabs matched the requested target URL.",
+        "command": PIPELINE_RETRY_EXACT_COMMAND,
+    },
+    "IMAGE_DIMENSION_MISMATCH": {
+        "id": "normalize-reference-size",
+        "label": "Retry with resize fallback",
+        "reason": "Reference/actual image dimensions differ.",
+        "command": PIPELINE_RETRY_BASE_COMMAND,
+    },
+    "COMMAND_TIMEOUT": {
+        "id": "increase-timeout",
+        "label": "Retry with longer timeout",
+        "reason": "Command exceeded timeout window before completion.",
+        "command": PIPELINE_RETRY_TIMEOUT_COMMAND,
+    },
+    "FILE_NOT_FOUND": {
+        "id": "verify-reference-path",
+        "label": "Verify file path",
+        "reason": "A referenced file path could not be resolved.",
+        "command": "ls -l <reference-image-path>",
+    },
+    "VALIDATION_ERROR": {
+        "id": "fix-scenario-payload",
+        "label": "Fix scenario payload and retry",
+        "reason": "Validation failed for scenario command payload.",
+        "command": PIPELINE_RETRY_BASE_COMMAND,
+    },
+}
+NEXT_ACTION_PRECEDENCE = {code: rank for rank, code in enumerate(NEXT_ACTION_TEMPLATES)}
+FAILURE_CATEGORY_CODES = {
+    "target-not-found": "TARGET_NOT_FOUND",
+    "session-already-running": "SESSION_ALREADY_RUNNING",
+    "cdp-unavailable": "CDP_UNAVAILABLE",
+    "ambiguous-target": "AMBIGUOUS_TARGET",
+}
+STALE_TRANSPORT_NEXT_ACTION = {
+    "id": "stale-transport-retry",
+    "label": "Retry with fresh session",
+    "reason": "Validation error indicates stale/closed transport state.",
+    "command": PIPELINE_RETRY_FORCE_RECOVERY_COMMAND,
+}
+DEFAULT_NEXT_ACTION = {
+    "id": "rerun-terminal-probe",
+    "label": "Rerun terminal-probe",
+    "reason": "Collect deterministic runtime artifacts for the next failure pass.",
+    "command": PIPELINE_RETRY_BASE_COMMAND,
+}
+
+
+class HttpResult(NamedTuple):
+    ok: bool
+    status: Optional[int]
+    json: Any
+    body: str
+    error: Optional[str]
+
+
+class Scenario(NamedTuple):
+    name: str
+    commands: List[Any]
+    reference_image_path: Optional[str]
+    full_page: bool
 
 
 class SessionEnsureError(RuntimeError):
@@ -91,7 +251,9 @@ class AutoSessionResolutionError(RuntimeError):
 
 
 def iso_now() -> str:
-    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    # Millisecond precision matches Core's Date.toISOString() timestamps and keeps a fixed
+    # width (plain isoformat() drops the fraction when microseconds happen to be zero).
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
 
 
 def safe_float(raw_value: str) -> Optional[float]:
@@ -110,17 +272,18 @@ def sanitize_body_snippet(raw_value: Any, limit: int = BODY_SNIPPET_LIMIT) -> Op
     else:
         text = str(raw_value)
 
-    text = text.replace("\n", " ").replace("\r", " ")
-    text = re.sub(r"\s+", " ", text).strip()
+    # str.split() collapses every whitespace run and trims both ends in one pass.
+    text = " ".join(text.split())
     if not text:
         return None
 
-    text = re.sub(
-        r'(?i)("?(?:token|secret|password|authorization|cookie)"?\s*:\s*")[^"]*(")',
-        r"\1<redacted>\2",
-        text,
-    )
-    text = re.sub(r"(?i)(bearer\s+)[A-Za-z0-9\-._~+/]+=*", r"\1<redacted>", text)
+    # Most bodies carry no credentials; skip both redaction scans unless a keyword
+    # is present. Non-ASCII text always gets scanned because IGNORECASE also folds
+    # characters such as U+017F that str.lower() leaves alone.
+    lowered = text.lower()
+    if not text.isascii() or any(keyword in lowered for keyword in SENSITIVE_KEYWORDS):
+        text = SECRET_FIELD_PATTERN.sub(r"\1<redacted>\2", text)
+        text = BEARER_TOKEN_PATTERN.sub(r"\1<redacted>", text)
 
     if len(text) <= limit:
         return text
@@ -155,6 +318,8 @@ def extract_error_fields(response_body: Any) -> Dict[str, Any]:
     }
 
 
+# Results are shared between callers and must be treated as read-only.
+@functools.lru_cache(maxsize=256)
 def parse_url_parts(raw_url: str) -> Optional[Dict[str, Any]]:
     try:
         parsed = urlparse(raw_url)
@@ -181,21 +346,42 @@ def parse_url_parts(raw_url: str) -> Optional[Dict[str, Any]]:
 
 
 def urls_match(candidate_url: str, requested_url: str, match_strategy: str) -> bool:
+    return url_match_predicate(requested_url, match_strategy)(candidate_url)
+
+
+def url_match_predicate(requested_url: str, match_strategy: str) -> Callable[[str], bool]:
+    # Resolve the strategy and parse the requested URL once; the returned
+    # predicate is then applied to each candidate URL.
     if match_strategy == "exact":
-        return candidate_url == requested_url
+        # Plain string equality: no URL parsing and no Python-level frame per target.
+        return functools.partial(operator.eq, requested_url)
 
-    candidate = parse_url_parts(candidate_url)
     requested = parse_url_parts(requested_url)
-    if not isinstance(candidate, dict) or not isinstance(requested, dict):
-        return False
+    if requested is None:
+        return lambda _candidate_url: False
+    requested_origin = requested["origin"]
 
     if match_strategy == "origin-path":
-        return candidate["origin"] == requested["origin"] and candidate["path"] == requested["path"]
+        requested_path = requested["path"]
+        return lambda candidate_url: (
+            (candidate := parse_url_parts(candidate_url)) is not None
+            and candidate["origin"] == requested_origin
+            and candidate["path"] == requested_path
+        )
 
     if match_strategy == "origin":
-        return candidate["origin"] == requested["origin"]
+        return lambda candidate_url: (
+            (candidate := parse_url_parts(candidate_url)) is not None
+            and candidate["origin"] == requested_origin
+        )
+
+    return lambda _candidate_url: False
 
-    return False
+
+# One scenario run issues many Core API and CDP requests against the same two
+# origins; keep their sockets open instead of reconnecting per call.
+HTTP_POOL = KeepAliveConnectionPool()
+atexit.register(HTTP_POOL.clear)
 
 
 def http_json(
@@ -203,63 +389,49 @@ def http_json(
     url: str,
     payload: Optional[Dict[str, Any]] = None,
     timeout: float = 15.0,
-) -> Dict[str, Any]:
-    body = json.dumps(payload).encode("utf-8") if payload is not None else None
-    request = Request(
-        url=url,
-        data=body,
-        method=method,
-        headers={"Content-Type": "application/json"},
-    )
+    body: Optional[bytes] = None,
+) -> HttpResult:
+    if body is None and payload is not None:
+        body = COMPACT_JSON_ENCODER.encode(payload).encode("utf-8")
 
     try:
-        with urlopen(request, timeout=timeout) as response:
-            raw_body = response.read().decode("utf-8")
-            parsed_body: Any
-            try:
-                parsed_body = json.loads(raw_body)
-            except ValueError:
-                parsed_body = None
-            return {
-                "ok": 200 <= response.status < 300,
-                "status": response.status,
-                "json": parsed_body,
-                "body": raw_body,
-            }
-    except HTTPError as exc:
-        raw_body = exc.read().decode("utf-8", errors="replace")
-        parsed_body: Any
-        try:
-            parsed_body = json.loads(raw_body)
-        except ValueError:
-            parsed_body = None
-        return {
-            "ok": False,
-            "status": exc.code,
-            "json": parsed_body,
-            "body": raw_body,
-            "error": str(exc),
-        }
-    except (URLError, TimeoutError, ValueError) as exc:
-        return {
-            "ok": False,
-            "status": None,
-            "json": None,
-            "body": "",
-            "error": str(exc),
-        }
+        status, reason, _headers, raw_bytes = HTTP_POOL.request(
+            method,
+            url,
+            body=body,
+            headers={"Content-Type": "application/json"},
+            timeout=timeout,
+        )
+    except (OSError, HTTPException, ValueError) as exc:
+        return HttpResult(ok=False, status=None, json=None, body="", error=str(exc))
+
+    # json.loads takes the raw bytes directly. The text form is only needed (and
+    # only decoded) when the body is not JSON, as the source for snippets.
+    parsed_body: Any
+    try:
+        parsed_body = json.loads(raw_bytes)
+    except ValueError:
+        parsed_body = None
+    ok = 200 <= status < 300
+    return HttpResult(
+        ok=ok,
+        status=status,
+        json=parsed_body,
+        body="" if parsed_body is not None else raw_bytes.decode("utf-8", errors="replace"),
+        error=None if ok else f"HTTP Error {status}: {reason}",
+    )
 
 
-def load_scenarios(path: Path) -> List[Dict[str, Any]]:
+def load_scenarios(path: Path) -> List[Scenario]:
     try:
-        payload = json.loads(path.read_text(encoding="utf-8"))
-    except json.JSONDecodeError as exc:
+        payload = json.loads(path.read_bytes())
+    except (json.JSONDecodeError, UnicodeDecodeError) as exc:
         raise RuntimeError(f"Scenario file is invalid JSON: {path}: {exc}") from exc
 
     if not isinstance(payload, list) or not payload:
         raise RuntimeError("Scenario file must be a non-empty JSON array")
 
-    scenarios: List[Dict[str, Any]] = []
+    scenarios: List[Scenario] = []
     for index, raw in enumerate(payload):
         if not isinstance(raw, dict):
             raise RuntimeError(f"Scenario index {index} must be an object")
@@ -281,79 +453,126 @@ def load_scenarios(path: Path) -> List[Dict[str, Any]]:
             raise RuntimeError(f"Scenario '{name_raw}' has invalid 'fullPage' (must be boolean)")
 
         scenarios.append(
-            {
-                "name": name_raw.strip(),
-                "commands": commands_raw,
-                "referenceImagePath": reference_path,
-                "fullPage": full_page,
-            }
+            Scenario(
+                name=name_raw.strip(),
+                commands=commands_raw,
+                reference_image_path=reference_path,
+                full_page=full_page,
+            )
         )
 
     return scenarios
 
 
+def build_reload_payload(step: Dict[str, Any], timeout_ms: int) -> Dict[str, Any]:
+    return {"waitUntil": "load", "timeoutMs": timeout_ms}
+
+
+def build_wait_payload(step: Dict[str, Any], timeout_ms: int) -> Dict[str, Any]:
+    wait_ms_raw = step.get("ms", timeout_ms)
+    wait_ms = wait_ms_raw if isinstance(wait_ms_raw, int) and wait_ms_raw > 0 else timeout_ms
+    return {"ms": wait_ms}
+
+
+def build_navigate_payload(step: Dict[str, Any], timeout_ms: int) -> Dict[str, Any]:
+    url = step.get("url")
+    if not isinstance(url, str) or not url:
+        raise RuntimeError("navigate step requires non-empty string 'url'")
+    return {"url": url, "waitUntil": "load", "timeoutMs": timeout_ms}
+
+
+def build_evaluate_payload(step: Dict[str, Any], timeout_ms: int) -> Dict[str, Any]:
+    expression = step.get("expression")
+    if not isinstance(expression, str) or not expression.strip():
+        raise RuntimeError("evaluate step requires non-empty string 'expression'")
+    await_promise = step.get("awaitPromise", True)
+    return_by_value = step.get("returnByValue", True)
+    return {
+        "expression": expression,
+        "awaitPromise": bool(await_promise),
+        "returnByValue": bool(return_by_value),
+        "timeoutMs": timeout_ms,
+    }
+
+
+def build_click_payload(step: Dict[str, Any], timeout_ms: int) -> Dict[str, Any]:
+    selector = step.get("selector")
+    if not isinstance(selector, str) or not selector:
+        raise RuntimeError("click step requires non-empty string 'selector'")
+    return {"selector": selector, "timeoutMs": timeout_ms}
+
+
+def build_type_payload(step: Dict[str, Any], timeout_ms: int) -> Dict[str, Any]:
+    selector = step.get("selector")
+    text = step.get("text")
+    if not isinstance(selector, str) or not selector:
+        raise RuntimeError("type step requires non-empty string 'selector'")
+    if not isinstance(text, str):
+        raise RuntimeError("type step requires string 'text'")
+    clear = bool(step.get("clear", True))
+    return {"selector": selector, "text": text, "clear": clear, "timeoutMs": timeout_ms}
+
+
+def build_snapshot_payload(step: Dict[str, Any], timeout_ms: int) -> Dict[str, Any]:
+    full_page = bool(step.get("fullPage", True))
+    return {"fullPage": full_page, "timeoutMs": timeout_ms}
+
+
+def build_webgl_diagnostics_payload(step: Dict[str, Any], timeout_ms: int) -> Dict[str, Any]:
+    return {"timeoutMs": timeout_ms}
+
+
+# Insertion order doubles as the "Allowed commands" list in the unsupported-command error.
+COMMAND_PAYLOAD_BUILDERS: Dict[str, Callable[[Dict[str, Any], int], Dict[str, Any]]] = {
+    "reload": build_reload_payload,
+    "wait": build_wait_payload,
+    "navigate": build_navigate_payload,
+    "evaluate": build_evaluate_payload,
+    "click": build_click_payload,
+    "type": build_type_payload,
+    "snapshot": build_snapshot_payload,
+    "webgl-diagnostics": build_webgl_diagnostics_payload,
+}
+
+
 def command_payload_from_step(step: Dict[str, Any], default_timeout_ms: int) -> Tuple[str, Dict[str, Any]]:
     command = step.get("do")
     if not isinstance(command, str) or not command:
         raise RuntimeError("Scenario command step requires non-empty string 'do'")
 
+    builder = COMMAND_PAYLOAD_BUILDERS.get(command)
+    if builder is None:
+        raise RuntimeError(
+            "Unsupported command "
+            f"'{command}'. Allowed commands: {', '.join(COMMAND_PAYLOAD_BUILDERS)}"
+        )
+
     timeout_raw = step.get("timeoutMs", default_timeout_ms)
     timeout_ms = timeout_raw if isinstance(timeout_raw, int) and timeout_raw > 0 else default_timeout_ms
+    return command, builder(step, timeout_ms)
 
-    if command == "reload":
-        return command, {"waitUntil": "load", "timeoutMs": timeout_ms}
-
-    if command == "wait":
-        wait_ms_raw = step.get("ms", timeout_ms)
-        wait_ms = wait_ms_raw if isinstance(wait_ms_raw, int) and wait_ms_raw > 0 else timeout_ms
-        return command, {"ms": wait_ms}
-
-    if command == "navigate":
-        url = step.get("url")
-        if not isinstance(url, str) or not url:
-            raise RuntimeError("navigate step requires non-empty string 'url'")
-        return command, {"url": url, "waitUntil": "load", "timeoutMs": timeout_ms}
-
-    if command == "evaluate":
-        expression = step.get("expression")
-        if not isinstance(expression, str) or not expression.strip():
-            raise RuntimeError("evaluate step requires non-empty string 'expression'")
-        await_promise = step.get("awaitPromise", True)
-        return_by_value = step.get("returnByValue", True)
-        return command, {
-            "expression": expression,
-            "awaitPromise": bool(await_promise),
-            "returnByValue": bool(return_by_value),
-            "timeoutMs": timeout_ms,
-        }
 
-    if command == "click":
-        selector = step.get("selector")
-        if not isinstance(selector, str) or not selector:
-            raise RuntimeError("click step requires non-empty string 'selector'")
-        return command, {"selector": selector, "timeoutMs": timeout_ms}
-
-    if command == "type":
-        selector = step.get("selector")
-        text = step.get("text")
-        if not isinstance(selector, str) or not selector:
-            raise RuntimeError("type step requires non-empty string 'selector'")
-        if not isinstance(text, str):
-            raise RuntimeError("type step requires string 'text'")
-        clear = bool(step.get("clear", True))
-        return command, {"selector": selector, "text": text, "clear": clear, "timeoutMs": timeout_ms}
-
-    if command == "webgl-diagnostics":
-        return command, {"timeoutMs": timeout_ms}
-
-    if command == "snapshot":
-        full_page = bool(step.get("fullPage", True))
-        return command, {"fullPage": full_page, "timeoutMs": timeout_ms}
-
-    raise RuntimeError(
-        "Unsupported command "
-        f"'{command}'. Allowed commands: reload, wait, navigate, evaluate, click, type, snapshot, webgl-diagnostics"
-    )
+def encode_command(session_id: Optional[str], command: str, payload: Dict[str, Any]) -> bytes:
+    request_payload: Dict[str, Any] = {
+        "command": command,
+        "payload": payload,
+    }
+    if isinstance(session_id, str) and session_id:
+        request_payload["sessionId"] = session_id
+    return COMPACT_JSON_ENCODER.encode(request_payload).encode("utf-8")
+
+
+def summarize_command_result(command_result: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "ok": command_result["ok"],
+        "status": command_result.get("status"),
+        "error": command_result.get("error"),
+        "errorCode": command_result.get("errorCode"),
+        "errorMessage": command_result.get("errorMessage"),
+        "errorDetails": command_result.get("errorDetails"),
+        "responseBodySnippet": command_result.get("responseBodySnippet"),
+        "result": command_result.get("result"),
+    }
 
 
 def run_core_command(
@@ -363,33 +582,40 @@ def run_core_command(
     payload: Dict[str, Any],
     timeout_seconds: float,
 ) -> Dict[str, Any]:
-    request_payload: Dict[str, Any] = {
-        "command": command,
-        "payload": payload,
-    }
-    if isinstance(session_id, str) and session_id:
-        request_payload["sessionId"] = session_id
-
     response = http_json(
         "POST",
         f"{core_base_url}/command",
-        payload=request_payload,
         timeout=timeout_seconds,
+        body=encode_command(session_id, command, payload),
     )
 
-    response_body = response.get("json")
-    snippet = sanitize_body_snippet(response_body if response_body is not None else response.get("body"))
+    response_body = response.json
+    if response.ok and isinstance(response_body, dict) and response_body.get("ok"):
+        # Success responses (often large snapshot/compare payloads) never need the
+        # sanitized snippet or error fields, so skip serializing and scanning them.
+        result = response_body.get("result")
+        if not isinstance(result, dict):
+            result = {}
+
+        return {
+            "ok": True,
+            "status": response.status,
+            "result": result,
+            "response": response_body,
+        }
+
+    snippet = sanitize_body_snippet(response_body if response_body is not None else response.body)
     error_fields = extract_error_fields(response_body)
-    if not response.get("ok"):
+    if not response.ok:
         error_message = (
             error_fields.get("errorMessage")
-            or response.get("error")
+            or response.error
             or snippet
             or "request failed"
         )
         return {
             "ok": False,
-            "status": response.get("status"),
+            "status": response.status,
             "error": error_message,
             "errorCode": error_fields.get("errorCode"),
             "errorMessage": error_fields.get("errorMessage"),
@@ -401,7 +627,7 @@ def run_core_command(
     if not isinstance(response_body, dict):
         return {
             "ok": False,
-            "status": response.get("status"),
+            "status": response.status,
             "error": "Core API returned non-JSON command payload",
             "errorCode": None,
             "errorMessage": None,
@@ -410,27 +636,14 @@ def run_core_command(
             "response": response_body,
         }
 
-    if not bool(response_body.get("ok")):
-        error_message = error_fields.get("errorMessage") or "Core API command failed"
-        return {
-            "ok": False,
-            "status": response.get("status"),
-            "error": error_message,
-            "errorCode": error_fields.get("errorCode"),
-            "errorMessage": error_fields.get("errorMessage"),
-            "errorDetails": error_fields.get("errorDetails"),
-            "responseBodySnippet": snippet,
-            "response": response_body,
-        }
-
-    result = response_body.get("result")
-    if not isinstance(result, dict):
-        result = {}
-
     return {
-        "ok": True,
-        "status": response.get("status"),
-        "result": result,
+        "ok": False,
+        "status": response.status,
+        "error": error_fields.get("errorMessage") or "Core API command failed",
+        "errorCode": error_fields.get("errorCode"),
+        "errorMessage": error_fields.get("errorMessage"),
+        "errorDetails": error_fields.get("errorDetails"),
+        "responseBodySnippet": snippet,
         "response": response_body,
     }
 
@@ -454,18 +667,18 @@ def ensure_session(
         },
         timeout=timeout_seconds,
     )
-    body = response.get("json")
-    if not response.get("ok"):
+    body = response.json
+    if not response.ok:
         error_fields = extract_error_fields(body)
-        snippet = sanitize_body_snippet(body if body is not None else response.get("body"))
+        snippet = sanitize_body_snippet(body if body is not None else response.body)
         message = (
             error_fields.get("errorMessage")
-            or response.get("error")
+            or response.error
             or snippet
             or "request failed"
         )
         raise SessionEnsureError(
-            status=response.get("status"),
+            status=response.status,
             error_code=error_fields.get("errorCode"),
             error_message=message,
             response_body_snippet=snippet,
@@ -492,8 +705,8 @@ def get_active_session_id(core_base_url: str, timeout_seconds: float) -> Optiona
         f"{core_base_url}/health",
         timeout=timeout_seconds,
     )
-    body = response.get("json")
-    if not response.get("ok") or not isinstance(body, dict):
+    body = response.json
+    if not response.ok or not isinstance(body, dict):
         return None
     active = body.get("activeSession")
     if not isinstance(active, dict):
@@ -511,94 +724,85 @@ def stop_session(core_base_url: str, session_id: str, timeout_seconds: float) ->
         payload={"sessionId": session_id},
         timeout=timeout_seconds,
     )
-    body = response.get("json")
-    snippet = sanitize_body_snippet(body if body is not None else response.get("body"))
+    body = response.json
+    snippet = sanitize_body_snippet(body if body is not None else response.body)
     error_fields = extract_error_fields(body)
-    if response.get("ok"):
+    if response.ok:
         return {
             "ok": True,
-            "status": response.get("status"),
+            "status": response.status,
             "responseBodySnippet": snippet,
         }
 
     return {
         "ok": False,
-        "status": response.get("status"),
+        "status": response.status,
         "errorCode": error_fields.get("errorCode"),
-        "errorMessage": error_fields.get("errorMessage") or response.get("error") or snippet,
+        "errorMessage": error_fields.get("errorMessage") or response.error or snippet,
         "responseBodySnippet": snippet,
     }
 
 
 def list_tabs_via_cdp(debug_port: int, timeout_seconds: float) -> Dict[str, Any]:
     endpoint = f"http://127.0.0.1:{debug_port}/json/list"
-    request = Request(endpoint, method="GET")
     try:
-        with urlopen(request, timeout=timeout_seconds) as response:
-            raw_body = response.read().decode("utf-8", errors="replace")
-            try:
-                parsed_body = json.loads(raw_body)
-            except ValueError:
-                parsed_body = None
-
-            if not isinstance(parsed_body, list):
-                return {
-                    "ok": False,
-                    "status": response.status,
-                    "endpoint": endpoint,
-                    "errorCode": "INVALID_CDP_LIST_RESPONSE",
-                    "errorMessage": "CDP /json/list did not return an array",
-                    "responseBodySnippet": sanitize_body_snippet(raw_body),
-                    "targets": [],
-                }
+        status, reason, _headers, raw_bytes = HTTP_POOL.request("GET", endpoint, body=None, headers={}, timeout=timeout_seconds)
+    except (OSError, HTTPException, ValueError) as exc:
+        return {
+            "ok": False,
+            "status": None,
+            "endpoint": endpoint,
+            "errorCode": "CDP_LIST_UNAVAILABLE",
+            "errorMessage": str(exc),
+            "responseBodySnippet": None,
+            "targets": [],
+        }
 
-            targets = [
-                {
-                    "id": item.get("id"),
-                    "url": item.get("url"),
-                    "type": item.get("type"),
-                }
-                for item in parsed_body
-                if isinstance(item, dict)
-            ]
-            page_targets = [
-                {
-                    "id": str(item.get("id")) if item.get("id") is not None else None,
-                    "url": str(item.get("url")) if isinstance(item.get("url"), str) else None,
-                    "type": item.get("type"),
-                }
-                for item in targets
-                if item.get("type") == "page" and isinstance(item.get("url"), str)
-            ]
-            return {
-                "ok": True,
-                "status": response.status,
-                "endpoint": endpoint,
-                "targets": page_targets,
-                "responseBodySnippet": sanitize_body_snippet(raw_body),
-            }
-    except HTTPError as exc:
-        raw_body = exc.read().decode("utf-8", errors="replace")
+    raw_body = raw_bytes.decode("utf-8", errors="replace")
+    if status >= 400:
         return {
             "ok": False,
-            "status": exc.code,
+            "status": status,
             "endpoint": endpoint,
             "errorCode": "CDP_LIST_HTTP_ERROR",
-            "errorMessage": str(exc),
+            "errorMessage": f"HTTP Error {status}: {reason}",
             "responseBodySnippet": sanitize_body_snippet(raw_body),
             "targets": [],
         }
-    except (URLError, TimeoutError, ValueError) as exc:
+
+    try:
+        parsed_body = json.loads(raw_body)
+    except ValueError:
+        parsed_body = None
+
+    if not isinstance(parsed_body, list):
         return {
             "ok": False,
-            "status": None,
+            "status": status,
             "endpoint": endpoint,
-            "errorCode": "CDP_LIST_UNAVAILABLE",
-            "errorMessage": str(exc),
-            "responseBodySnippet": None,
+            "errorCode": "INVALID_CDP_LIST_RESPONSE",
+            "errorMessage": "CDP /json/list did not return an array",
+            "responseBodySnippet": sanitize_body_snippet(raw_body),
             "targets": [],
         }
 
+    page_targets = [
+        {
+            "id": str(target_id) if (target_id := item.get("id")) is not None else None,
+            "url": url,
+            "type": "page",
+        }
+        for item in parsed_body
+        if isinstance(item, dict) and item.get("type") == "page" and isinstance(url := item.get("url"), str)
+    ]
+    return {
+        "ok": True,
+        "status": status,
+        "endpoint": endpoint,
+        "targets": page_targets,
+        "responseBodySnippet": sanitize_body_snippet(raw_body),
+    }
+
 
 def resolve_exact_tab_url_via_cdp(
     tab_url: str,
@@ -606,7 +810,10 @@ def resolve_exact_tab_url_via_cdp(
     match_strategy: str,
     timeout_seconds: float,
 ) -> Dict[str, Any]:
-    listed = list_tabs_via_cdp(debug_port, timeout_seconds)
+    return match_cdp_targets(list_tabs_via_cdp(debug_port, timeout_seconds), tab_url, match_strategy)
+
+
+def match_cdp_targets(listed: Dict[str, Any], tab_url: str, match_strategy: str) -> Dict[str, Any]:
     if not listed.get("ok"):
         return {
             "ok": False,
@@ -624,20 +831,17 @@ def resolve_exact_tab_url_via_cdp(
     if not isinstance(targets, list):
         targets = []
 
-    matched_targets = []
-    for item in targets:
-        if not isinstance(item, dict):
-            continue
-        url_value = item.get("url")
-        if not isinstance(url_value, str):
-            continue
-        if urls_match(url_value, tab_url, match_strategy):
-            matched_targets.append(
-                {
-                    "id": item.get("id"),
-                    "url": url_value,
-                }
-            )
+    matches_tab_url = url_match_predicate(tab_url, match_strategy)
+    matched_targets = [
+        {
+            "id": item.get("id"),
+            "url": url_value,
+        }
+        for item in targets
+        if isinstance(item, dict)
+        and isinstance(url_value := item.get("url"), str)
+        and matches_tab_url(url_value)
+    ]
 
     if len(matched_targets) == 0:
         return {
@@ -687,49 +891,50 @@ def open_tab_via_cdp(tab_url: str, debug_port: int, timeout_seconds: float) -> D
     last_failure: Optional[Dict[str, Any]] = None
 
     for method in methods:
-        request = Request(endpoint, method=method)
         try:
-            with urlopen(request, timeout=timeout_seconds) as response:
-                raw_body = response.read().decode("utf-8", errors="replace")
-                parsed_body: Any
-                try:
-                    parsed_body = json.loads(raw_body)
-                except ValueError:
-                    parsed_body = None
-
-                target_id = parsed_body.get("id") if isinstance(parsed_body, dict) else None
-                target_url = parsed_body.get("url") if isinstance(parsed_body, dict) else None
-                return {
-                    "ok": True,
-                    "status": response.status,
-                    "method": method,
-                    "endpoint": endpoint,
-                    "targetId": target_id,
-                    "targetUrl": target_url,
-                    "responseBodySnippet": sanitize_body_snippet(raw_body),
-                }
-        except HTTPError as exc:
-            raw_body = exc.read().decode("utf-8", errors="replace")
+            status, reason, _headers, raw_bytes = HTTP_POOL.request(method, endpoint, body=None, headers={}, timeout=timeout_seconds)
+        except (OSError, HTTPException, ValueError) as exc:
             last_failure = {
                 "ok": False,
-                "status": exc.code,
+                "status": None,
                 "method": method,
                 "endpoint": endpoint,
                 "errorMessage": str(exc),
-                "responseBodySnippet": sanitize_body_snippet(raw_body),
+                "responseBodySnippet": None,
             }
-            if exc.code not in {404, 405}:
-                break
-        except (URLError, TimeoutError, ValueError) as exc:
+            break
+
+        raw_body = raw_bytes.decode("utf-8", errors="replace")
+        if status >= 400:
             last_failure = {
                 "ok": False,
-                "status": None,
+                "status": status,
                 "method": method,
                 "endpoint": endpoint,
-                "errorMessage": str(exc),
-                "responseBodySnippet": None,
+                "errorMessage": f"HTTP Error {status}: {reason}",
+                "responseBodySnippet": sanitize_body_snippet(raw_body),
             }
-            break
+            if status not in {404, 405}:
+                break
+            continue
+
+        parsed_body: Any
+        try:
+            parsed_body = json.loads(raw_body)
+        except ValueError:
+            parsed_body = None
+
+        target_id = parsed_body.get("id") if isinstance(parsed_body, dict) else None
+        target_url = parsed_body.get("url") if isinstance(parsed_body, dict) else None
+        return {
+            "ok": True,
+            "status": status,
+            "method": method,
+            "endpoint": endpoint,
+            "targetId": target_id,
+            "targetUrl": target_url,
+            "responseBodySnippet": sanitize_body_snippet(raw_body),
+        }
 
     return last_failure or {
         "ok": False,
@@ -753,6 +958,47 @@ def classify_session_failure(error: SessionEnsureError) -> str:
     return "session-ensure-failed"
 
 
+def stop_active_session(core_base_url: str, timeout_seconds: float, lifecycle: Dict[str, Any]) -> None:
+    active_session_id = get_active_session_id(core_base_url, timeout_seconds)
+    if not active_session_id:
+        lifecycle["actions"].append(
+            {
+                "action": "stop-active-session",
+                "ok": True,
+                "status": None,
+                "skipped": True,
+                "reason": "no-active-session",
+            }
+        )
+        return
+
+    stop_result = stop_session(core_base_url, active_session_id, timeout_seconds)
+    lifecycle["actions"].append(
+        {
+            "action": "stop-active-session",
+            "sessionId": active_session_id,
+            **stop_result,
+        }
+    )
+    if not bool(stop_result.get("ok")):
+        lifecycle["failureCategory"] = "session-stop-failed"
+        raise AutoSessionResolutionError(
+            (
+                "force-new-session failed: "
+                f"status={stop_result.get('status')} "
+                f"code={stop_result.get('errorCode')} "
+                f"message={stop_result.get('errorMessage')}"
+            ),
+            failure_category="session-stop-failed",
+            error_code=(
+                str(stop_result.get("errorCode"))
+                if isinstance(stop_result.get("errorCode"), str)
+                else None
+            ),
+            lifecycle=lifecycle,
+        )
+
+
 def resolve_auto_session(
     core_base_url: str,
     tab_url: str,
@@ -775,63 +1021,38 @@ def resolve_auto_session(
         "attachBranch": "direct-ensure",
         "actions": [],
     }
+    actions_log: List[Dict[str, Any]] = lifecycle["actions"]
+
+    # A successful CDP /json/list result is shared by the preflight and the
+    # TARGET_NOT_FOUND re-resolve; it is dropped once a new tab is opened.
+    cdp_listing: Optional[Dict[str, Any]] = None
 
     if force_new_session:
-        active_session_id = get_active_session_id(core_base_url, timeout_seconds)
-        if active_session_id:
-            stop_result = stop_session(core_base_url, active_session_id, timeout_seconds)
-            lifecycle["actions"].append(
-                {
-                    "action": "stop-active-session",
-                    "sessionId": active_session_id,
-                    **stop_result,
-                }
-            )
-            if not bool(stop_result.get("ok")):
-                lifecycle["failureCategory"] = "session-stop-failed"
-                raise AutoSessionResolutionError(
-                    (
-                        "force-new-session failed: "
-                        f"status={stop_result.get('status')} "
-                        f"code={stop_result.get('errorCode')} "
-                        f"message={stop_result.get('errorMessage')}"
-                    ),
-                    failure_category="session-stop-failed",
-                    error_code=(
-                        str(stop_result.get("errorCode"))
-                        if isinstance(stop_result.get("errorCode"), str)
-                        else None
-                    ),
-                    lifecycle=lifecycle,
-                )
+        if tab_url_match_strategy != "exact":
+            # Stopping a session only detaches CDP and never changes the tab list, so
+            # fetch the preflight listing while the health/stop round-trips run.
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                cdp_listing_future = executor.submit(list_tabs_via_cdp, debug_port, timeout_seconds)
+                stop_active_session(core_base_url, timeout_seconds, lifecycle)
+                cdp_listing = cdp_listing_future.result()
         else:
-            lifecycle["actions"].append(
-                {
-                    "action": "stop-active-session",
-                    "ok": True,
-                    "status": None,
-                    "skipped": True,
-                    "reason": "no-active-session",
-                }
-            )
+            stop_active_session(core_base_url, timeout_seconds, lifecycle)
         reuse_active = False
 
     opened_tab_for_target_recovery = False
     resolved_exact_tab_url = False
-    fallback_actions_used: List[str] = []
+    # Insertion-ordered dict used as an ordered set of fallback action names.
+    fallback_actions_used: Dict[str, None] = {}
     attach_branch = "direct-ensure"
     current_tab_url = tab_url
 
     # Preflight: when a unique target is already visible in CDP list, bind to exact URL
     # before the first /session/ensure to reduce first-attempt TARGET_NOT_FOUND churn.
     if tab_url_match_strategy != "exact":
-        preflight_resolved_tab = resolve_exact_tab_url_via_cdp(
-            tab_url=current_tab_url,
-            debug_port=debug_port,
-            match_strategy=tab_url_match_strategy,
-            timeout_seconds=timeout_seconds,
-        )
-        lifecycle["actions"].append(
+        if cdp_listing is None:
+            cdp_listing = list_tabs_via_cdp(debug_port, timeout_seconds)
+        preflight_resolved_tab = match_cdp_targets(cdp_listing, current_tab_url, tab_url_match_strategy)
+        actions_log.append(
             {
                 "action": "preflight-resolve-target-from-cdp-list",
                 **preflight_resolved_tab,
@@ -842,8 +1063,7 @@ def resolve_auto_session(
             tab_url_match_strategy = "exact"
             resolved_exact_tab_url = True
             attach_branch = "preflight-resolve-target-from-cdp-list"
-            if "preflight-resolve-target-from-cdp-list" not in fallback_actions_used:
-                fallback_actions_used.append("preflight-resolve-target-from-cdp-list")
+            fallback_actions_used.setdefault("preflight-resolve-target-from-cdp-list", None)
             lifecycle["fallbackUsed"] = True
 
     for attempt in range(1, SESSION_ENSURE_RETRY_LIMIT + 1):
@@ -857,7 +1077,7 @@ def resolve_auto_session(
                 match_strategy=tab_url_match_strategy,
                 timeout_seconds=timeout_seconds,
             )
-            lifecycle["actions"].append(
+            actions_log.append(
                 {
                     "action": "ensure-session",
                     "attempt": attempt,
@@ -883,7 +1103,7 @@ def resolve_auto_session(
         except SessionEnsureError as exc:
             failure_category = classify_session_failure(exc)
             lifecycle["failureCategory"] = failure_category
-            lifecycle["actions"].append(
+            actions_log.append(
                 {
                     "action": "ensure-session",
                     "attempt": attempt,
@@ -899,13 +1119,10 @@ def resolve_auto_session(
             )
 
             if failure_category == "target-not-found" and not resolved_exact_tab_url:
-                resolved_tab = resolve_exact_tab_url_via_cdp(
-                    tab_url=current_tab_url,
-                    debug_port=debug_port,
-                    match_strategy=tab_url_match_strategy,
-                    timeout_seconds=timeout_seconds,
-                )
-                lifecycle["actions"].append(
+                if cdp_listing is None or not cdp_listing.get("ok"):
+                    cdp_listing = list_tabs_via_cdp(debug_port, timeout_seconds)
+                resolved_tab = match_cdp_targets(cdp_listing, current_tab_url, tab_url_match_strategy)
+                actions_log.append(
                     {
                         "action": "resolve-target-from-cdp-list",
                         **resolved_tab,
@@ -916,8 +1133,7 @@ def resolve_auto_session(
                     tab_url_match_strategy = "exact"
                     resolved_exact_tab_url = True
                     attach_branch = "resolve-target-from-cdp-list"
-                    if "resolve-target-from-cdp-list" not in fallback_actions_used:
-                        fallback_actions_used.append("resolve-target-from-cdp-list")
+                    fallback_actions_used.setdefault("resolve-target-from-cdp-list", None)
                     lifecycle["fallbackUsed"] = True
                     continue
                 if resolved_tab.get("errorCode") == "AMBIGUOUS_TARGET":
@@ -940,7 +1156,8 @@ def resolve_auto_session(
                 and failure_category == "target-not-found"
             ):
                 open_tab_result = open_tab_via_cdp(current_tab_url, debug_port, timeout_seconds)
-                lifecycle["actions"].append(
+                cdp_listing = None
+                actions_log.append(
                     {
                         "action": "open-tab-if-missing",
                         **open_tab_result,
@@ -949,8 +1166,7 @@ def resolve_auto_session(
                 if bool(open_tab_result.get("ok")):
                     opened_tab_for_target_recovery = True
                     attach_branch = "open-tab-if-missing"
-                    if "open-tab-if-missing" not in fallback_actions_used:
-                        fallback_actions_used.append("open-tab-if-missing")
+                    fallback_actions_used.setdefault("open-tab-if-missing", None)
                     lifecycle["fallbackUsed"] = True
                     continue
                 raise AutoSessionResolutionError(
@@ -969,19 +1185,25 @@ def resolve_auto_session(
                 )
 
             if failure_category == "cdp-unavailable" and attempt < SESSION_ENSURE_RETRY_LIMIT:
-                backoff_seconds = round(0.4 * attempt, 2)
-                lifecycle["actions"].append(
+                # Capped exponential backoff with jitter: short CDP blips recover quickly and
+                # concurrent pipelines do not retry in lockstep.
+                target_seconds = min(
+                    SESSION_BACKOFF_CAP_SECONDS,
+                    SESSION_BACKOFF_BASE_SECONDS * (2 ** (attempt - 1)),
+                )
+                backoff_seconds = round(random.uniform(0.5 * target_seconds, 1.5 * target_seconds), 3)
+                actions_log.append(
                     {
                         "action": "retry-after-backoff",
                         "attempt": attempt,
                         "ok": True,
                         "reason": "cdp-unavailable",
+                        "targetSeconds": target_seconds,
                         "seconds": backoff_seconds,
                     }
                 )
                 attach_branch = "retry-after-backoff"
-                if "retry-after-backoff" not in fallback_actions_used:
-                    fallback_actions_used.append("retry-after-backoff")
+                fallback_actions_used.setdefault("retry-after-backoff", None)
                 lifecycle["fallbackUsed"] = True
                 time.sleep(backoff_seconds)
                 continue
@@ -1009,8 +1231,9 @@ def resolve_auto_session(
     )
 
 
+@functools.lru_cache(maxsize=1)
 def find_magick_binary() -> Optional[str]:
-    for binary in ["magick", "convert"]:
+    for binary in ("magick", "convert"):
         resolved = shutil.which(binary)
         if resolved:
             return resolved
@@ -1019,13 +1242,16 @@ def find_magick_binary() -> Optional[str]:
 
 def run_magick_metric(command: List[str]) -> Dict[str, Any]:
     try:
-        completed = subprocess.run(command, check=False, capture_output=True, text=True)
+        # close_fds=False (safe: Python fds are non-inheritable by default) lets
+        # subprocess launch the absolute magick path via posix_spawn instead of fork+exec.
+        completed = subprocess.run(command, check=False, capture_output=True, close_fds=False)
     except OSError as exc:
         return {"ok": False, "reason": str(exc)}
 
+    # Capture bytes and decode only what is returned: stderr is read on failure only.
+    stdout = completed.stdout.decode("utf-8", errors="replace").strip() if completed.stdout else ""
     if completed.returncode != 0:
-        stderr = (completed.stderr or "").strip()
-        stdout = (completed.stdout or "").strip()
+        stderr = completed.stderr.decode("utf-8", errors="replace").strip() if completed.stderr else ""
         return {
             "ok": False,
             "reason": stderr or stdout or f"exit code {completed.returncode}",
@@ -1033,11 +1259,66 @@ def run_magick_metric(command: List[str]) -> Dict[str, Any]:
 
     return {
         "ok": True,
-        "stdout": (completed.stdout or "").strip(),
+        "stdout": stdout,
+    }
+
+
+def compute_image_metrics_numpy(image_path: str) -> Optional[Dict[str, Any]]:
+    if numpy is None or Image is None:
+        return None
+
+    # Transparent pixels are flattened onto black, matching "-background black -alpha remove".
+    luma_weights = numpy.asarray(REC709_LUMA_WEIGHTS, dtype=numpy.float32) / numpy.float32(255.0)
+    gray_sum = 0.0
+    gray_square_sum = 0.0
+    non_black_count = 0
+    try:
+        with Image.open(image_path) as image:
+            has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+            pixel_mode = "RGBA" if has_alpha else "RGB"
+            pixel_image = image if image.mode == pixel_mode else image.convert(pixel_mode)
+            width, height = pixel_image.size
+            # Strips are copied out of the decoded image one at a time, so no full-size
+            # array (uint8 or float) ever exists next to it.
+            for row_start in range(0, height, IMAGE_METRICS_STRIP_ROWS):
+                row_end = min(row_start + IMAGE_METRICS_STRIP_ROWS, height)
+                strip = numpy.asarray(pixel_image.crop((0, row_start, width, row_end)))
+                gray = strip[..., :3] @ luma_weights
+                # All luma weights are positive, so a pixel is non-black exactly when any channel is
+                # non-zero; this matches "-threshold 0" on the gray image without 8-bit rounding.
+                lit = strip[..., :3].any(axis=2)
+                if has_alpha:
+                    alpha = strip[..., 3]
+                    gray *= alpha.astype(numpy.float32) / 255.0
+                    lit &= alpha > 0
+                non_black_count += int(numpy.count_nonzero(lit))
+                gray_sum += float(gray.sum(dtype=numpy.float64))
+                numpy.square(gray, out=gray)
+                gray_square_sum += float(gray.sum(dtype=numpy.float64))
+    except IMAGE_DECODE_ERRORS:
+        return None
+
+    pixel_count = width * height
+    if pixel_count == 0:
+        return None
+    mean_value = gray_sum / pixel_count
+    non_black_ratio = non_black_count / pixel_count
+    return {
+        "ok": True,
+        "tool": "numpy",
+        "reason": None,
+        "mean": mean_value,
+        "stddev": max(gray_square_sum / pixel_count - mean_value * mean_value, 0.0) ** 0.5,
+        "nonBlackRatio": non_black_ratio,
+        "nonBlackPercent": non_black_ratio * 100.0,
     }
 
 
 def compute_image_metrics(image_path: str, magick_binary: Optional[str]) -> Dict[str, Any]:
+    numpy_metrics = compute_image_metrics_numpy(image_path)
+    if numpy_metrics is not None:
+        return numpy_metrics
+
     if not magick_binary:
         return {
             "ok": False,
@@ -1049,10 +1330,56 @@ def compute_image_metrics(image_path: str, magick_binary: Optional[str]) -> Dict
             "nonBlackPercent": None,
         }
 
+    # One decode for all three metrics: the thresholded clone becomes a second image in
+    # the list, so info: prints "mean,stddev" for the gray image and then for the clone
+    # (whose mean is the non-black ratio).
+    fused = run_magick_metric(
+        [
+            magick_binary,
+            image_path,
+            "-background",
+            "black",
+            "-alpha",
+            "remove",
+            "-colorspace",
+            "Gray",
+            "(",
+            "+clone",
+            "-threshold",
+            "0",
+            ")",
+            "-format",
+            "%[fx:mean],%[fx:standard_deviation]\\n",
+            "info:",
+        ]
+    )
+    if fused.get("ok"):
+        fused_lines = str(fused.get("stdout", "")).splitlines()
+        if len(fused_lines) == 2:
+            gray_parts = fused_lines[0].split(",", 1)
+            fused_mean = safe_float(gray_parts[0])
+            fused_stddev = safe_float(gray_parts[1]) if len(gray_parts) == 2 else None
+            fused_non_black = safe_float(fused_lines[1].split(",", 1)[0])
+            if fused_mean is not None and fused_stddev is not None and fused_non_black is not None:
+                return {
+                    "ok": True,
+                    "tool": magick_binary,
+                    "reason": None,
+                    "mean": fused_mean,
+                    "stddev": fused_stddev,
+                    "nonBlackRatio": fused_non_black,
+                    "nonBlackPercent": fused_non_black * 100.0,
+                }
+
+    # Fall back to separate probes so failures keep their per-metric reasons.
     mean_std = run_magick_metric(
         [
             magick_binary,
             image_path,
+            "-background",
+            "black",
+            "-alpha",
+            "remove",
             "-colorspace",
             "Gray",
             "-format",
@@ -1101,6 +1428,10 @@ def compute_image_metrics(image_path: str, magick_binary: Optional[str]) -> Dict
         [
             magick_binary,
             image_path,
+            "-background",
+            "black",
+            "-alpha",
+            "remove",
             "-colorspace",
             "Gray",
             "-threshold",
@@ -1144,6 +1475,114 @@ def compute_image_metrics(image_path: str, magick_binary: Optional[str]) -> Dict
     }
 
 
+def sha1_file(path: str) -> Optional[str]:
+    try:
+        with open(path, "rb") as handle:
+            if os.fstat(handle.fileno()).st_size == 0:
+                return hashlib.sha1().hexdigest()
+            # Hash straight from the page cache: no Python-level read buffers or copies.
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return hashlib.sha1(mapped).hexdigest()
+    except (OSError, ValueError):
+        return None
+
+
+def read_image_dimensions(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        with open(path, "rb") as handle:
+            header = handle.read(24)
+            if header[:8] == b"\x89PNG\r\n\x1a\n":
+                if len(header) < 24 or header[12:16] != b"IHDR":
+                    return None
+                return int.from_bytes(header[16:20], "big"), int.from_bytes(header[20:24], "big")
+            if header[:2] != b"\xff\xd8":
+                return None
+            handle.seek(2)
+            while True:
+                marker = handle.read(2)
+                if len(marker) < 2 or marker[0] != 0xFF:
+                    return None
+                if marker[1] == 0xFF:
+                    handle.seek(-1, os.SEEK_CUR)
+                    continue
+                if marker[1] in (0x01, 0xD8) or 0xD0 <= marker[1] <= 0xD7:
+                    continue
+                segment_length = int.from_bytes(handle.read(2), "big")
+                if segment_length < 2:
+                    return None
+                if marker[1] in JPEG_SOF_MARKERS:
+                    frame = handle.read(5)
+                    if len(frame) < 5:
+                        return None
+                    return int.from_bytes(frame[3:5], "big"), int.from_bytes(frame[1:3], "big")
+                handle.seek(segment_length - 2, os.SEEK_CUR)
+    except OSError:
+        return None
+
+
+def load_cached_result(cache_dir: Path, key: str) -> Optional[Dict[str, Any]]:
+    cache_path = cache_dir / f"{key}.json"
+    try:
+        cached = json.loads(cache_path.read_bytes())
+    except (OSError, json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    if not isinstance(cached, dict):
+        return None
+    try:
+        # Refresh mtime so eviction drops least-recently-used entries first.
+        os.utime(cache_path)
+    except OSError:
+        pass
+    return cached
+
+
+def store_cached_result(cache_dir: Path, key: str, payload: Dict[str, Any]) -> None:
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        write_json(cache_dir / f"{key}.json", payload)
+        entries = list(cache_dir.glob("*.json"))
+        if len(entries) <= RESULT_CACHE_MAX_ENTRIES:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+    except OSError:
+        return
+    for stale_entry in entries[: len(entries) - RESULT_CACHE_MAX_ENTRIES]:
+        try:
+            stale_entry.unlink()
+        except OSError:
+            pass
+
+
+def image_metrics_backend(magick_binary: Optional[str]) -> str:
+    if numpy is not None and Image is not None:
+        return "numpy"
+    if magick_binary:
+        return re.sub(r"[^A-Za-z0-9_.-]", "_", Path(magick_binary).name)
+    return "none"
+
+
+def compute_image_metrics_cached(
+    image_path: str,
+    magick_binary: Optional[str],
+    cache_dir: Optional[Path],
+) -> Dict[str, Any]:
+    # Identical screenshots (same page state across scenarios or re-runs) reuse the
+    # metrics of the first decode, keyed by file content, backend and formula version.
+    image_hash = sha1_file(image_path) if cache_dir is not None else None
+    if cache_dir is None or image_hash is None:
+        return compute_image_metrics(image_path, magick_binary)
+
+    key = f"metrics-v{IMAGE_METRICS_CACHE_VERSION}-{image_metrics_backend(magick_binary)}-{image_hash}"
+    cached = load_cached_result(cache_dir, key)
+    if cached is not None and cached.get("ok"):
+        return cached
+
+    metrics = compute_image_metrics(image_path, magick_binary)
+    if metrics.get("ok"):
+        store_cached_result(cache_dir, key, metrics)
+    return metrics
+
+
 def average(values: List[float]) -> Optional[float]:
     if not values:
         return None
@@ -1174,18 +1613,25 @@ def extract_framebuffer_non_black_ratio(runtime_entry: Dict[str, Any]) -> Option
 def should_retry_navigate_with_evaluate(command_result: Dict[str, Any]) -> bool:
     if command_result.get("ok"):
         return False
-    error_text = " ".join(
-        [
-            str(command_result.get("error") or ""),
-            str(command_result.get("errorMessage") or ""),
-            str(command_result.get("responseBodySnippet") or ""),
-        ]
-    ).lower()
-    return "page.once is not a function" in error_text or "client.page.once" in error_text
+    # Check each field on its own so a hit in the short error text never pays for
+    # joining and lowercasing a multi-KB response snippet.
+    for field in ("error", "errorMessage", "responseBodySnippet"):
+        text = command_result.get(field)
+        if text and NAVIGATE_ONCE_FAILURE_PATTERN.search(str(text)) is not None:
+            return True
+    return False
+
+
+def js_string_literal(value: str) -> str:
+    # Printable ASCII only needs quotes and backslashes escaped (same output as json.dumps);
+    # anything else (control characters, U+2028, non-ASCII) goes through json.dumps.
+    if value.isascii() and value.isprintable():
+        return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return json.dumps(value)
 
 
 def build_navigate_fallback_expression(url: str) -> str:
-    escaped = json.dumps(url)
+    escaped = js_string_literal(url)
     return (
         "(() => { "
         f"window.location.assign({escaped}); "
@@ -1194,36 +1640,25 @@ def build_navigate_fallback_expression(url: str) -> str:
     )
 
 
-def classify_failure_bucket(runtime_entry: Dict[str, Any]) -> str:
-    tooling_error_codes = {
-        "CDP_UNAVAILABLE",
-        "SESSION_NOT_FOUND",
-        "TARGET_NOT_FOUND",
-        "SESSION_ALREADY_RUNNING",
-        "COMMAND_TIMEOUT",
-        "VALIDATION_ERROR",
-        "AMBIGUOUS_TARGET",
-        "IMAGE_DIMENSION_MISMATCH",
-        "FILE_NOT_FOUND",
-        "UNSUPPORTED_IMAGE_FORMAT",
-    }
-
+def iter_runtime_error_codes(runtime_entry: Dict[str, Any]) -> Iterator[Any]:
     command_entries = runtime_entry.get("commands")
     if isinstance(command_entries, list):
         for item in command_entries:
-            if not isinstance(item, dict):
-                continue
-            error_code = item.get("errorCode")
-            if isinstance(error_code, str) and error_code in tooling_error_codes:
-                return "tooling"
+            if isinstance(item, dict):
+                yield item.get("errorCode")
 
-    for key in ["snapshot", "compareReference"]:
+    for key in ("snapshot", "compareReference"):
         record = runtime_entry.get(key)
         if isinstance(record, dict):
-            error_code = record.get("errorCode")
-            if isinstance(error_code, str) and error_code in tooling_error_codes:
-                return "tooling"
+            yield record.get("errorCode")
+
 
+def classify_failure_bucket(runtime_entry: Dict[str, Any]) -> str:
+    if any(
+        isinstance(error_code, str) and error_code in TOOLING_ERROR_CODES
+        for error_code in iter_runtime_error_codes(runtime_entry)
+    ):
+        return "tooling"
     return "app"
 
 
@@ -1231,13 +1666,9 @@ def is_stale_transport_error(
     error_message: Optional[str],
     response_body_snippet: Optional[str],
 ) -> bool:
-    text = " ".join(
-        [
-            str(error_message or ""),
-            str(response_body_snippet or ""),
-        ]
-    ).lower()
-    return any(hint in text for hint in STALE_TRANSPORT_HINTS)
+    # One case-insensitive alternation scan replaces lower() plus a substring scan per hint.
+    text = f"{error_message or ''} {response_body_snippet or ''}"
+    return STALE_TRANSPORT_PATTERN.search(text) is not None
 
 
 def build_failure_next_action(
@@ -1254,95 +1685,34 @@ def build_failure_next_action(
         if isinstance(failure_category, str) and failure_category.strip()
         else None
     )
-    stale_transport = is_stale_transport_error(error_message, response_body_snippet)
-
-    if normalized_category == "target-not-found" or normalized_code == "TARGET_NOT_FOUND":
-        return {
-            "id": "open-tab-recovery",
-            "label": "Open missing tab and retry",
-            "reason": "Target tab was not found while ensuring session.",
-            "command": PIPELINE_RETRY_FORCE_RECOVERY_COMMAND,
-            "source": source,
-        }
-
-    if normalized_category == "session-already-running" or normalized_code == "SESSION_ALREADY_RUNNING":
-        return {
-            "id": "replace-active-session",
-            "label": "Replace active session",
-            "reason": "Active session conflict blocked ensure/reuse flow.",
-            "command": SESSION_RESTART_COMMAND,
-            "source": source,
-        }
 
-    if normalized_category == "cdp-unavailable" or normalized_code == "CDP_UNAVAILABLE":
-        return {
-            "id": "recover-cdp-session",
-            "label": "Recover CDP and session",
-            "reason": "CDP endpoint/session channel is unavailable.",
-            "command": VISUAL_START_RECOVERY_COMMAND,
-            "source": source,
-        }
+    # Code and category may point at different templates; the earlier table entry wins.
+    candidates = [
+        code
+        for code in (normalized_code, FAILURE_CATEGORY_CODES.get(normalized_category))
+        if code in NEXT_ACTION_PRECEDENCE
+    ]
+    if not candidates:
+        return {**DEFAULT_NEXT_ACTION, "source": source}
 
-    if normalized_category == "ambiguous-target" or normalized_code == "AMBIGUOUS_TARGET":
-        return {
-            "id": "use-exact-target",
-            "label": "Use exact target match",
-            "reason": "Multiple tabs matched the requested target URL.",
-            "command": PIPELINE_RETRY_EXACT_COMMAND,
-            "source": source,
-        }
+    matched_code = min(candidates, key=NEXT_ACTION_PRECEDENCE.__getitem__)
+    if matched_code == "VALIDATION_ERROR" and is_stale_transport_error(error_message, response_body_snippet):
+        return {**STALE_TRANSPORT_NEXT_ACTION, "source": source}
+    return {**NEXT_ACTION_TEMPLATES[matched_code], "source": source}
 
-    if normalized_code == "IMAGE_DIMENSION_MISMATCH":
-        return {
-            "id": "normalize-reference-size",
-            "label": "Retry with resize fallback",
-            "reason": "Reference/actual image dimensions differ.",
-            "command": PIPELINE_RETRY_BASE_COMMAND,
-            "source": source,
-        }
 
-    if normalized_code == "COMMAND_TIMEOUT":
-        return {
-            "id": "increase-timeout",
-            "label": "Retry with longer timeout",
-            "reason": "Command exceeded timeout window before completion.",
-            "command": PIPELINE_RETRY_TIMEOUT_COMMAND,
-            "source": source,
-        }
+def str_or_none(value: Any) -> Optional[str]:
+    return value if isinstance(value, str) else None
 
-    if normalized_code == "FILE_NOT_FOUND":
-        return {
-            "id": "verify-reference-path",
-            "label": "Verify file path",
-            "reason": "A referenced file path could not be resolved.",
-            "command": "ls -l <reference-image-path>",
-            "source": source,
-        }
-
-    if normalized_code == "VALIDATION_ERROR":
-        if stale_transport:
-            return {
-                "id": "stale-transport-retry",
-                "label": "Retry with fresh session",
-                "reason": "Validation error indicates stale/closed transport state.",
-                "command": PIPELINE_RETRY_FORCE_RECOVERY_COMMAND,
-                "source": source,
-            }
-        return {
-            "id": "fix-scenario-payload",
-            "label": "Fix scenario payload and retry",
-            "reason": "Validation failed for scenario command payload.",
-            "command": PIPELINE_RETRY_BASE_COMMAND,
-            "source": source,
-        }
 
-    return {
-        "id": "rerun-terminal-probe",
-        "label": "Rerun terminal-probe",
-        "reason": "Collect deterministic runtime artifacts for the next failure pass.",
-        "command": PIPELINE_RETRY_BASE_COMMAND,
-        "source": source,
-    }
+def next_action_from_result(source: str, command_result: Dict[str, Any]) -> Dict[str, Any]:
+    error_message = command_result.get("errorMessage")
+    return build_failure_next_action(
+        source=source,
+        error_code=str_or_none(command_result.get("errorCode")),
+        error_message=error_message if isinstance(error_message, str) else str(command_result.get("error")),
+        response_body_snippet=str_or_none(command_result.get("responseBodySnippet")),
+    )
 
 
 def select_primary_next_action(runtime_scenarios: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
@@ -1361,10 +1731,11 @@ def build_black_screen_verdict(
     black_frame_candidates: List[str],
     framebuffer_metric_mismatches: List[str],
 ) -> Dict[str, Any]:
-    screenshot_black_scenarios: List[str] = []
-    screenshot_non_black_scenarios: List[str] = []
-    framebuffer_black_scenarios: List[str] = []
-    runtime_render_error_scenarios: List[str] = []
+    # Sets dedupe as they fill, so the evidence lists only need a final sort.
+    screenshot_black_scenarios: Set[str] = set()
+    screenshot_non_black_scenarios: Set[str] = set()
+    framebuffer_black_scenarios: Set[str] = set()
+    runtime_render_error_scenarios: Set[str] = set()
 
     for metrics_entry in metrics_scenarios:
         if not isinstance(metrics_entry, dict):
@@ -1378,15 +1749,14 @@ def build_black_screen_verdict(
             non_black_ratio = image_metrics.get("nonBlackRatio")
             if isinstance(non_black_ratio, (int, float)):
                 if float(non_black_ratio) < 0.01:
-                    screenshot_black_scenarios.append(scenario_name)
+                    screenshot_black_scenarios.add(scenario_name)
                 else:
-                    screenshot_non_black_scenarios.append(scenario_name)
+                    screenshot_non_black_scenarios.add(scenario_name)
 
         framebuffer_ratio = metrics_entry.get("framebufferNonBlackRatio")
         if isinstance(framebuffer_ratio, (int, float)) and float(framebuffer_ratio) < 0.01:
-            framebuffer_black_scenarios.append(scenario_name)
+            framebuffer_black_scenarios.add(scenario_name)
 
-    render_error_hints = ["webgl", "shader", "render", "canvas", "context lost"]
     for runtime_entry in runtime_scenarios:
         if not isinstance(runtime_entry, dict):
             continue
@@ -1396,9 +1766,9 @@ def build_black_screen_verdict(
         errors = runtime_entry.get("errors")
         if not isinstance(errors, list):
             continue
-        combined_error_text = " ".join(str(item) for item in errors).lower()
-        if any(hint in combined_error_text for hint in render_error_hints):
-            runtime_render_error_scenarios.append(scenario_name)
+        combined_error_text = " ".join(str(item) for item in errors)
+        if RENDER_ERROR_PATTERN.search(combined_error_text) is not None:
+            runtime_render_error_scenarios.add(scenario_name)
 
     if screenshot_black_scenarios:
         confidence = "high" if runtime_render_error_scenarios else "medium"
@@ -1434,12 +1804,12 @@ def build_black_screen_verdict(
         "sourceOfTruth": "screenshot-metrics-plus-runtime-errors",
         "rationale": rationale,
         "evidence": {
-            "screenshotBlackScenarios": sorted(set(screenshot_black_scenarios)),
-            "screenshotNonBlackScenarios": sorted(set(screenshot_non_black_scenarios)),
-            "framebufferBlackScenarios": sorted(set(framebuffer_black_scenarios)),
+            "screenshotBlackScenarios": sorted(screenshot_black_scenarios),
+            "screenshotNonBlackScenarios": sorted(screenshot_non_black_scenarios),
+            "framebufferBlackScenarios": sorted(framebuffer_black_scenarios),
             "framebufferMetricMismatches": sorted(set(framebuffer_metric_mismatches)),
             "blackFrameCandidates": sorted(set(black_frame_candidates)),
-            "runtimeRenderErrorScenarios": sorted(set(runtime_render_error_scenarios)),
+            "runtimeRenderErrorScenarios": sorted(runtime_render_error_scenarios),
         },
     }
 
@@ -1470,13 +1840,20 @@ def prepare_output_dir(project_root: Path, output_dir: Optional[str], session_id
 
 
 def write_json(path: Path, payload: Any) -> None:
-    path.write_text(json.dumps(payload, indent=2, ensure_ascii=True) + "\n", encoding="utf-8")
+    # Raw UTF-8 keeps non-ASCII URLs and messages readable and skips per-character
+    # \uXXXX escaping; lone surrogates echoed from Core cannot be UTF-8 encoded, so
+    # those payloads fall back to the escaped ASCII form.
+    try:
+        data = ARTIFACT_JSON_ENCODER.encode(payload).encode("utf-8")
+    except UnicodeEncodeError:
+        data = ARTIFACT_ASCII_JSON_ENCODER.encode(payload).encode("ascii")
+    path.write_bytes(data + b"\n")
 
 
 def run_pipeline(
     core_base_url: str,
     session_id: str,
-    scenarios: List[Dict[str, Any]],
+    scenarios: List[Scenario],
     output_dir: Path,
     timeout_ms: int,
     session_lifecycle: Optional[Dict[str, Any]] = None,
@@ -1484,6 +1861,7 @@ def run_pipeline(
     resize_interpolation: str = DEFAULT_RESIZE_INTERPOLATION,
     navigate_fallback: bool = True,
     mode_selection: Optional[Dict[str, Any]] = None,
+    metrics_cache_dir: Optional[Path] = None,
 ) -> Dict[str, Any]:
     timeout_seconds = max(timeout_ms / 1000.0, 1.0)
     magick_binary = find_magick_binary()
@@ -1491,434 +1869,355 @@ def run_pipeline(
     runtime_scenarios: List[Dict[str, Any]] = []
     metrics_scenarios: List[Dict[str, Any]] = []
     warnings: List[str] = []
-    if not magick_binary:
+    metrics_available = bool(magick_binary) or (numpy is not None and Image is not None)
+    if not metrics_available:
         warnings.append("ImageMagick not detected; mean/stddev/nonBlackRatio metrics will be null.")
 
-    for scenario in scenarios:
-        scenario_name = str(scenario["name"])
-        scenario_commands = list(scenario.get("commands", []))
-        reference_image_path = scenario.get("referenceImagePath")
-
-        runtime_entry: Dict[str, Any] = {
-            "name": scenario_name,
-            "startedAt": iso_now(),
-            "commands": [],
-            "snapshot": None,
-            "compareReference": None,
-            "errors": [],
-            "nextAction": None,
-        }
+    # Scenarios share one browser session and must run in order, but image metrics only
+    # read the finished snapshot file, so metrics run while the next scenario drives Core.
+    metrics_pool = ThreadPoolExecutor(max_workers=IMAGE_METRICS_WORKERS) if metrics_available else None
+    pending_image_metrics: List[Tuple[Dict[str, Any], Future]] = []
 
-        scenario_failed = False
+    try:
+        for scenario in scenarios:
+            scenario_name = scenario.name
+            scenario_commands = scenario.commands
+            reference_image_path = scenario.reference_image_path
+
+            runtime_entry: Dict[str, Any] = {
+                "name": scenario_name,
+                "startedAt": iso_now(),
+                "commands": [],
+                "snapshot": None,
+                "compareReference": None,
+                "errors": [],
+                "nextAction": None,
+            }
 
-        for raw_step in scenario_commands:
-            if not isinstance(raw_step, dict):
-                runtime_entry["errors"].append("Scenario command step must be an object")
-                runtime_entry["nextAction"] = build_failure_next_action(
-                    source="scenario-definition",
-                    error_message="Scenario command step must be an object",
-                )
-                scenario_failed = True
-                break
+            scenario_failed = False
 
-            try:
-                command, payload = command_payload_from_step(raw_step, timeout_ms)
-            except RuntimeError as exc:
-                runtime_entry["errors"].append(str(exc))
-                runtime_entry["nextAction"] = build_failure_next_action(
-                    source="scenario-definition",
-                    error_code="VALIDATION_ERROR",
-                    error_message=str(exc),
-                )
-                scenario_failed = True
-                break
+            for raw_step in scenario_commands:
+                if not isinstance(raw_step, dict):
+                    runtime_entry["errors"].append("Scenario command step must be an object")
+                    runtime_entry["nextAction"] = build_failure_next_action(
+                        source="scenario-definition",
+                        error_message="Scenario command step must be an object",
+                    )
+                    scenario_failed = True
+                    break
 
-            command_result = run_core_command(core_base_url, session_id, command, payload, timeout_seconds)
-            runtime_entry["commands"].append(
-                {
-                    "command": command,
-                    "payload": payload,
-                    "ok": command_result["ok"],
-                    "status": command_result.get("status"),
-                    "error": command_result.get("error"),
-                    "errorCode": command_result.get("errorCode"),
-                    "errorMessage": command_result.get("errorMessage"),
-                    "errorDetails": command_result.get("errorDetails"),
-                    "responseBodySnippet": command_result.get("responseBodySnippet"),
-                    "result": command_result.get("result"),
-                }
-            )
-            if not command_result["ok"]:
-                fallback_recovered = False
-                if command == "navigate" and navigate_fallback and should_retry_navigate_with_evaluate(command_result):
-                    fallback_payload = {
-                        "expression": build_navigate_fallback_expression(str(payload.get("url") or "")),
-                        "awaitPromise": True,
-                        "returnByValue": True,
-                        "timeoutMs": timeout_ms,
-                    }
-                    fallback_result = run_core_command(
-                        core_base_url,
-                        session_id,
-                        "evaluate",
-                        fallback_payload,
-                        timeout_seconds,
+                try:
+                    command, payload = command_payload_from_step(raw_step, timeout_ms)
+                except RuntimeError as exc:
+                    runtime_entry["errors"].append(str(exc))
+                    runtime_entry["nextAction"] = build_failure_next_action(
+                        source="scenario-definition",
+                        error_code="VALIDATION_ERROR",
+                        error_message=str(exc),
                     )
-                    runtime_entry["commands"].append(
-                        {
-                            "command": "evaluate",
-                            "payload": fallback_payload,
-                            "ok": fallback_result["ok"],
-                            "status": fallback_result.get("status"),
-                            "error": fallback_result.get("error"),
-                            "errorCode": fallback_result.get("errorCode"),
-                            "errorMessage": fallback_result.get("errorMessage"),
-                            "errorDetails": fallback_result.get("errorDetails"),
-                            "responseBodySnippet": fallback_result.get("responseBodySnippet"),
-                            "result": fallback_result.get("result"),
-                            "fallbackFor": "navigate",
+                    scenario_failed = True
+                    break
+
+                command_result = run_core_command(core_base_url, session_id, command, payload, timeout_seconds)
+                runtime_entry["commands"].append(
+                    {
+                        "command": command,
+                        "payload": payload,
+                        **summarize_command_result(command_result),
+                    }
+                )
+                if not command_result["ok"]:
+                    fallback_recovered = False
+                    if command == "navigate" and navigate_fallback and should_retry_navigate_with_evaluate(command_result):
+                        fallback_payload = {
+                            "expression": build_navigate_fallback_expression(str(payload.get("url") or "")),
+                            "awaitPromise": True,
+                            "returnByValue": True,
+                            "timeoutMs": timeout_ms,
                         }
-                    )
-                    if fallback_result["ok"]:
-                        fallback_recovered = True
-                        warnings.append(
-                            "Navigate fallback used evaluate(window.location.assign(...)) after navigate command failure."
+                        fallback_result = run_core_command(
+                            core_base_url,
+                            session_id,
+                            "evaluate",
+                            fallback_payload,
+                            timeout_seconds,
                         )
-                    else:
-                        runtime_entry["nextAction"] = build_failure_next_action(
-                            source="scenario-command",
-                            error_code=(
-                                str(fallback_result.get("errorCode"))
-                                if isinstance(fallback_result.get("errorCode"), str)
-                                else None
-                            ),
-                            error_message=(
-                                str(fallback_result.get("errorMessage"))
-                                if isinstance(fallback_result.get("errorMessage"), str)
-                                else str(fallback_result.get("error"))
-                            ),
-                            response_body_snippet=(
-                                str(fallback_result.get("responseBodySnippet"))
-                                if isinstance(fallback_result.get("responseBodySnippet"), str)
-                                else None
-                            ),
+                        runtime_entry["commands"].append(
+                            {
+                                "command": "evaluate",
+                                "payload": fallback_payload,
+                                **summarize_command_result(fallback_result),
+                                "fallbackFor": "navigate",
+                            }
                         )
-                        scenario_failed = True
-                        fallback_error_code = fallback_result.get("errorCode")
-                        if isinstance(fallback_error_code, str) and fallback_error_code:
-                            runtime_entry["errors"].append(
-                                "Scenario command 'navigate' fallback failed "
-                                f"[{fallback_error_code}]: {fallback_result.get('error')}"
+                        if fallback_result["ok"]:
+                            fallback_recovered = True
+                            warnings.append(
+                                "Navigate fallback used evaluate(window.location.assign(...)) after navigate command failure."
                             )
                         else:
-                            runtime_entry["errors"].append(
-                                "Scenario command 'navigate' fallback failed: "
-                                f"{fallback_result.get('error')}"
-                            )
-                        break
+                            runtime_entry["nextAction"] = next_action_from_result("scenario-command", fallback_result)
+                            scenario_failed = True
+                            fallback_error_code = fallback_result.get("errorCode")
+                            if isinstance(fallback_error_code, str) and fallback_error_code:
+                                runtime_entry["errors"].append(
+                                    "Scenario command 'navigate' fallback failed "
+                                    f"[{fallback_error_code}]: {fallback_result.get('error')}"
+                                )
+                            else:
+                                runtime_entry["errors"].append(
+                                    "Scenario command 'navigate' fallback failed: "
+                                    f"{fallback_result.get('error')}"
+                                )
+                            break
+
+                    if fallback_recovered:
+                        continue
 
-                if fallback_recovered:
-                    continue
+                    scenario_failed = True
+                    runtime_entry["nextAction"] = next_action_from_result("scenario-command", command_result)
+                    command_error_code = command_result.get("errorCode")
+                    if isinstance(command_error_code, str) and command_error_code:
+                        runtime_entry["errors"].append(
+                            f"Scenario command '{command}' failed [{command_error_code}]: {command_result.get('error')}"
+                        )
+                    else:
+                        runtime_entry["errors"].append(
+                            f"Scenario command '{command}' failed: {command_result.get('error')}"
+                        )
+                    break
 
-                scenario_failed = True
-                runtime_entry["nextAction"] = build_failure_next_action(
-                    source="scenario-command",
-                    error_code=(
-                        str(command_result.get("errorCode"))
-                        if isinstance(command_result.get("errorCode"), str)
-                        else None
-                    ),
-                    error_message=(
-                        str(command_result.get("errorMessage"))
-                        if isinstance(command_result.get("errorMessage"), str)
-                        else str(command_result.get("error"))
-                    ),
-                    response_body_snippet=(
-                        str(command_result.get("responseBodySnippet"))
-                        if isinstance(command_result.get("responseBodySnippet"), str)
-                        else None
-                    ),
+            snapshot_path: Optional[str] = None
+            if not scenario_failed:
+                snapshot_payload = {
+                    "fullPage": scenario.full_page,
+                    "timeoutMs": timeout_ms,
+                }
+                snapshot_result = run_core_command(
+                    core_base_url,
+                    session_id,
+                    "snapshot",
+                    snapshot_payload,
+                    timeout_seconds,
                 )
-                command_error_code = command_result.get("errorCode")
-                if isinstance(command_error_code, str) and command_error_code:
-                    runtime_entry["errors"].append(
-                        f"Scenario command '{command}' failed [{command_error_code}]: {command_result.get('error')}"
-                    )
-                else:
-                    runtime_entry["errors"].append(
-                        f"Scenario command '{command}' failed: {command_result.get('error')}"
-                    )
-                break
-
-        snapshot_path: Optional[str] = None
-        if not scenario_failed:
-            snapshot_payload = {
-                "fullPage": bool(scenario.get("fullPage", True)),
-                "timeoutMs": timeout_ms,
-            }
-            snapshot_result = run_core_command(
-                core_base_url,
-                session_id,
-                "snapshot",
-                snapshot_payload,
-                timeout_seconds,
-            )
-            runtime_entry["snapshot"] = {
-                "ok": snapshot_result["ok"],
-                "status": snapshot_result.get("status"),
-                "error": snapshot_result.get("error"),
-                "errorCode": snapshot_result.get("errorCode"),
-                "errorMessage": snapshot_result.get("errorMessage"),
-                "errorDetails": snapshot_result.get("errorDetails"),
-                "responseBodySnippet": snapshot_result.get("responseBodySnippet"),
-                "payload": snapshot_payload,
-                "result": snapshot_result.get("result"),
-            }
-            if snapshot_result["ok"]:
-                result = snapshot_result.get("result")
-                if isinstance(result, dict) and isinstance(result.get("path"), str):
-                    snapshot_path = result["path"]
+                runtime_entry["snapshot"] = {
+                    **summarize_command_result(snapshot_result),
+                    "payload": snapshot_payload,
+                }
+                if snapshot_result["ok"]:
+                    result = snapshot_result.get("result")
+                    if isinstance(result, dict) and isinstance(result.get("path"), str):
+                        snapshot_path = result["path"]
+                    else:
+                        scenario_failed = True
+                        runtime_entry["errors"].append("Snapshot command returned no image path")
+                        runtime_entry["nextAction"] = build_failure_next_action(
+                            source="snapshot",
+                            error_message="Snapshot command returned no image path",
+                        )
                 else:
                     scenario_failed = True
-                    runtime_entry["errors"].append("Snapshot command returned no image path")
-                    runtime_entry["nextAction"] = build_failure_next_action(
-                        source="snapshot",
-                        error_message="Snapshot command returned no image path",
-                    )
-            else:
-                scenario_failed = True
-                runtime_entry["nextAction"] = build_failure_next_action(
-                    source="snapshot",
-                    error_code=(
-                        str(snapshot_result.get("errorCode"))
-                        if isinstance(snapshot_result.get("errorCode"), str)
-                        else None
-                    ),
-                    error_message=(
-                        str(snapshot_result.get("errorMessage"))
-                        if isinstance(snapshot_result.get("errorMessage"), str)
-                        else str(snapshot_result.get("error"))
-                    ),
-                    response_body_snippet=(
-                        str(snapshot_result.get("responseBodySnippet"))
-                        if isinstance(snapshot_result.get("responseBodySnippet"), str)
-                        else None
-                    ),
-                )
-                snapshot_error_code = snapshot_result.get("errorCode")
-                if isinstance(snapshot_error_code, str) and snapshot_error_code:
-                    runtime_entry["errors"].append(
-                        f"Snapshot failed [{snapshot_error_code}]: {snapshot_result.get('error')}"
-                    )
-                else:
-                    runtime_entry["errors"].append(f"Snapshot failed: {snapshot_result.get('error')}")
-
-        compare_result: Optional[Dict[str, Any]] = None
-        if not scenario_failed and isinstance(reference_image_path, str) and reference_image_path.strip() and snapshot_path:
-            compare_payload_strict = {
-                "actualImagePath": snapshot_path,
-                "referenceImagePath": reference_image_path,
-                "label": scenario_name,
-                "writeDiff": True,
-                "dimensionPolicy": "strict",
-                "resizeInterpolation": resize_interpolation,
-            }
-            compare_attempts: List[Dict[str, Any]] = []
-            compare_result = run_core_command(
-                core_base_url,
-                session_id,
-                "compare-reference",
-                compare_payload_strict,
-                timeout_seconds,
-            )
-            compare_attempts.append(
-                {
-                    "ok": compare_result["ok"],
-                    "status": compare_result.get("status"),
-                    "error": compare_result.get("error"),
-                    "errorCode": compare_result.get("errorCode"),
-                    "errorMessage": compare_result.get("errorMessage"),
-                    "errorDetails": compare_result.get("errorDetails"),
-                    "responseBodySnippet": compare_result.get("responseBodySnippet"),
-                    "payload": compare_payload_strict,
-                    "result": compare_result.get("result"),
-                }
-            )
+                    runtime_entry["nextAction"] = next_action_from_result("snapshot", snapshot_result)
+                    snapshot_error_code = snapshot_result.get("errorCode")
+                    if isinstance(snapshot_error_code, str) and snapshot_error_code:
+                        runtime_entry["errors"].append(
+                            f"Snapshot failed [{snapshot_error_code}]: {snapshot_result.get('error')}"
+                        )
+                    else:
+                        runtime_entry["errors"].append(f"Snapshot failed: {snapshot_result.get('error')}")
 
-            if (
-                not compare_result["ok"]
-                and compare_result.get("errorCode") == "IMAGE_DIMENSION_MISMATCH"
-                and normalize_reference_size
-            ):
-                compare_payload_resize = {
+            compare_result: Optional[Dict[str, Any]] = None
+            if not scenario_failed and isinstance(reference_image_path, str) and reference_image_path.strip() and snapshot_path:
+                compare_payload_strict = {
                     "actualImagePath": snapshot_path,
                     "referenceImagePath": reference_image_path,
                     "label": scenario_name,
                     "writeDiff": True,
-                    "dimensionPolicy": "resize-reference-to-actual",
+                    "dimensionPolicy": "strict",
                     "resizeInterpolation": resize_interpolation,
                 }
+                compare_payload_resize = {
+                    **compare_payload_strict,
+                    "dimensionPolicy": "resize-reference-to-actual",
+                }
+                # A known size mismatch would only bounce off the strict policy, so go straight to resize.
+                first_compare_payload = compare_payload_strict
+                if normalize_reference_size and os.path.isabs(snapshot_path) and os.path.isabs(reference_image_path):
+                    snapshot_dimensions = read_image_dimensions(snapshot_path)
+                    reference_dimensions = read_image_dimensions(reference_image_path)
+                    if snapshot_dimensions and reference_dimensions and snapshot_dimensions != reference_dimensions:
+                        first_compare_payload = compare_payload_resize
+                compare_attempts: List[Dict[str, Any]] = []
                 compare_result = run_core_command(
                     core_base_url,
                     session_id,
                     "compare-reference",
-                    compare_payload_resize,
+                    first_compare_payload,
                     timeout_seconds,
                 )
                 compare_attempts.append(
                     {
-                        "ok": compare_result["ok"],
-                        "status": compare_result.get("status"),
-                        "error": compare_result.get("error"),
-                        "errorCode": compare_result.get("errorCode"),
-                        "errorMessage": compare_result.get("errorMessage"),
-                        "errorDetails": compare_result.get("errorDetails"),
-                        "responseBodySnippet": compare_result.get("responseBodySnippet"),
-                        "payload": compare_payload_resize,
-                        "result": compare_result.get("result"),
+                        **summarize_command_result(compare_result),
+                        "payload": first_compare_payload,
                     }
                 )
-                if compare_result["ok"]:
+
+                if (
+                    first_compare_payload is compare_payload_strict
+                    and not compare_result["ok"]
+                    and compare_result.get("errorCode") == "IMAGE_DIMENSION_MISMATCH"
+                    and normalize_reference_size
+                ):
+                    compare_result = run_core_command(
+                        core_base_url,
+                        session_id,
+                        "compare-reference",
+                        compare_payload_resize,
+                        timeout_seconds,
+                    )
+                    compare_attempts.append(
+                        {
+                            **summarize_command_result(compare_result),
+                            "payload": compare_payload_resize,
+                        }
+                    )
+                resize_attempted = compare_attempts[-1]["payload"] is compare_payload_resize
+                if resize_attempted and compare_result["ok"]:
                     warnings.append(
                         f"compare-reference auto-resized reference for scenario '{scenario_name}' "
                         f"using {resize_interpolation} interpolation."
                     )
 
-            final_compare_payload = (
-                compare_attempts[-1].get("payload") if compare_attempts else compare_payload_strict
-            )
-            runtime_entry["compareReference"] = {
-                "ok": compare_result["ok"],
-                "status": compare_result.get("status"),
-                "error": compare_result.get("error"),
-                "errorCode": compare_result.get("errorCode"),
-                "errorMessage": compare_result.get("errorMessage"),
-                "errorDetails": compare_result.get("errorDetails"),
-                "responseBodySnippet": compare_result.get("responseBodySnippet"),
-                "payload": final_compare_payload,
-                "result": compare_result.get("result"),
-                "attempts": compare_attempts,
-                "fallbackApplied": len(compare_attempts) > 1,
-            }
-            if not compare_result["ok"]:
-                scenario_failed = True
-                runtime_entry["nextAction"] = build_failure_next_action(
-                    source="compare-reference",
-                    error_code=(
-                        str(compare_result.get("errorCode"))
-                        if isinstance(compare_result.get("errorCode"), str)
-                        else None
-                    ),
-                    error_message=(
-                        str(compare_result.get("errorMessage"))
-                        if isinstance(compare_result.get("errorMessage"), str)
-                        else str(compare_result.get("error"))
-                    ),
-                    response_body_snippet=(
-                        str(compare_result.get("responseBodySnippet"))
-                        if isinstance(compare_result.get("responseBodySnippet"), str)
-                        else None
-                    ),
+                final_compare_payload = compare_attempts[-1]["payload"]
+                runtime_entry["compareReference"] = {
+                    **summarize_command_result(compare_result),
+                    "payload": final_compare_payload,
+                    "attempts": compare_attempts,
+                    "fallbackApplied": resize_attempted,
+                }
+                if not compare_result["ok"]:
+                    scenario_failed = True
+                    runtime_entry["nextAction"] = next_action_from_result("compare-reference", compare_result)
+                    compare_error_code = compare_result.get("errorCode")
+                    if isinstance(compare_error_code, str) and compare_error_code:
+                        runtime_entry["errors"].append(
+                            f"compare-reference failed [{compare_error_code}]: {compare_result.get('error')}"
+                        )
+                    else:
+                        runtime_entry["errors"].append(f"compare-reference failed: {compare_result.get('error')}")
+
+            image_metrics_future: Optional[Future] = None
+            image_metrics: Optional[Dict[str, Any]] = None
+            if snapshot_path and metrics_pool is not None:
+                image_metrics_future = metrics_pool.submit(
+                    compute_image_metrics_cached,
+                    snapshot_path,
+                    magick_binary,
+                    metrics_cache_dir,
                 )
-                compare_error_code = compare_result.get("errorCode")
-                if isinstance(compare_error_code, str) and compare_error_code:
-                    runtime_entry["errors"].append(
-                        f"compare-reference failed [{compare_error_code}]: {compare_result.get('error')}"
-                    )
-                else:
-                    runtime_entry["errors"].append(f"compare-reference failed: {compare_result.get('error')}")
+            elif snapshot_path:
+                image_metrics = compute_image_metrics_cached(snapshot_path, magick_binary, metrics_cache_dir)
+            else:
+                image_metrics = {
+                    "ok": False,
+                    "tool": magick_binary,
+                    "reason": "Snapshot path unavailable",
+                    "mean": None,
+                    "stddev": None,
+                    "nonBlackRatio": None,
+                    "nonBlackPercent": None,
+                }
 
-        image_metrics = (
-            compute_image_metrics(snapshot_path, magick_binary)
-            if snapshot_path
-            else {
-                "ok": False,
-                "tool": magick_binary,
-                "reason": "Snapshot path unavailable",
-                "mean": None,
-                "stddev": None,
-                "nonBlackRatio": None,
-                "nonBlackPercent": None,
+            compare_metrics = None
+            compare_artifacts = None
+            if compare_result and compare_result.get("ok"):
+                compare_payload = compare_result.get("result")
+                if isinstance(compare_payload, dict):
+                    metrics_value = compare_payload.get("metrics")
+                    artifacts_value = compare_payload.get("artifacts")
+                    if isinstance(metrics_value, dict):
+                        compare_metrics = metrics_value
+                    if isinstance(artifacts_value, dict):
+                        compare_artifacts = artifacts_value
+
+            framebuffer_non_black_ratio = extract_framebuffer_non_black_ratio(runtime_entry)
+            metrics_entry: Dict[str, Any] = {
+                "name": scenario_name,
+                "ok": not scenario_failed,
+                "snapshotPath": snapshot_path,
+                "referenceImagePath": reference_image_path,
+                "imageMetrics": image_metrics,
+                "framebufferNonBlackRatio": framebuffer_non_black_ratio,
+                "compareMetrics": compare_metrics,
+                "compareArtifacts": compare_artifacts,
+                "errors": list(runtime_entry["errors"]),
             }
-        )
 
-        compare_metrics = None
-        compare_artifacts = None
-        if compare_result and compare_result.get("ok"):
-            compare_payload = compare_result.get("result")
-            if isinstance(compare_payload, dict):
-                metrics_value = compare_payload.get("metrics")
-                artifacts_value = compare_payload.get("artifacts")
-                if isinstance(metrics_value, dict):
-                    compare_metrics = metrics_value
-                if isinstance(artifacts_value, dict):
-                    compare_artifacts = artifacts_value
-
-        framebuffer_non_black_ratio = extract_framebuffer_non_black_ratio(runtime_entry)
-        metrics_entry: Dict[str, Any] = {
-            "name": scenario_name,
-            "ok": not scenario_failed,
-            "snapshotPath": snapshot_path,
-            "referenceImagePath": reference_image_path,
-            "imageMetrics": image_metrics,
-            "framebufferNonBlackRatio": framebuffer_non_black_ratio,
-            "compareMetrics": compare_metrics,
-            "compareArtifacts": compare_artifacts,
-            "errors": list(runtime_entry["errors"]),
-        }
+            runtime_entry["finishedAt"] = iso_now()
+            runtime_entry["ok"] = not scenario_failed
+            if scenario_failed and not isinstance(runtime_entry.get("nextAction"), dict):
+                runtime_entry["nextAction"] = build_failure_next_action(
+                    source="scenario",
+                    error_message="Scenario failed without categorized error details",
+                )
 
-        runtime_entry["finishedAt"] = iso_now()
-        runtime_entry["ok"] = not scenario_failed
-        if scenario_failed and not isinstance(runtime_entry.get("nextAction"), dict):
-            runtime_entry["nextAction"] = build_failure_next_action(
-                source="scenario",
-                error_message="Scenario failed without categorized error details",
-            )
+            runtime_scenarios.append(runtime_entry)
+            metrics_scenarios.append(metrics_entry)
+            if image_metrics_future is not None:
+                pending_image_metrics.append((metrics_entry, image_metrics_future))
 
-        runtime_scenarios.append(runtime_entry)
-        metrics_scenarios.append(metrics_entry)
+        for metrics_entry, image_metrics_future in pending_image_metrics:
+            try:
+                metrics_entry["imageMetrics"] = image_metrics_future.result()
+            except Exception as exc:  # noqa: BLE001
+                metrics_entry["imageMetrics"] = {
+                    "ok": False,
+                    "tool": magick_binary,
+                    "reason": f"Image metrics failed: {exc}",
+                    "mean": None,
+                    "stddev": None,
+                    "nonBlackRatio": None,
+                    "nonBlackPercent": None,
+                }
+    finally:
+        if metrics_pool is not None:
+            # A scenario that raised leaves queued metrics behind; drop them instead of waiting.
+            for _metrics_entry, image_metrics_future in pending_image_metrics:
+                image_metrics_future.cancel()
+            metrics_pool.shutdown()
+
+    # One pass over the metrics entries feeds every aggregate and candidate list.
+    mean_values: List[float] = []
+    stddev_values: List[float] = []
+    non_black_values: List[float] = []
+    mae_rgb_values: List[float] = []
+    black_frame_candidates: List[str] = []
+    framebuffer_metric_mismatches: List[str] = []
+    for entry in metrics_scenarios:
+        image_metrics = entry.get("imageMetrics")
+        if isinstance(image_metrics, dict):
+            mean_value = image_metrics.get("mean")
+            if isinstance(mean_value, (int, float)):
+                mean_values.append(float(mean_value))
+            stddev_value = image_metrics.get("stddev")
+            if isinstance(stddev_value, (int, float)):
+                stddev_values.append(float(stddev_value))
+            non_black_value = image_metrics.get("nonBlackRatio")
+            if isinstance(non_black_value, (int, float)):
+                non_black_values.append(float(non_black_value))
+                if float(non_black_value) < 0.01:
+                    black_frame_candidates.append(entry["name"])
+                else:
+                    framebuffer_ratio = entry.get("framebufferNonBlackRatio")
+                    if isinstance(framebuffer_ratio, (int, float)) and float(framebuffer_ratio) < 0.01:
+                        framebuffer_metric_mismatches.append(entry["name"])
 
-    mean_values = [
-        float(entry["imageMetrics"]["mean"])
-        for entry in metrics_scenarios
-        if isinstance(entry.get("imageMetrics"), dict)
-        and isinstance(entry["imageMetrics"].get("mean"), (int, float))
-    ]
-    stddev_values = [
-        float(entry["imageMetrics"]["stddev"])
-        for entry in metrics_scenarios
-        if isinstance(entry.get("imageMetrics"), dict)
-        and isinstance(entry["imageMetrics"].get("stddev"), (int, float))
-    ]
-    non_black_values = [
-        float(entry["imageMetrics"]["nonBlackRatio"])
-        for entry in metrics_scenarios
-        if isinstance(entry.get("imageMetrics"), dict)
-        and isinstance(entry["imageMetrics"].get("nonBlackRatio"), (int, float))
-    ]
-    mae_rgb_values = [
-        float(entry["compareMetrics"]["maeRgb"])
-        for entry in metrics_scenarios
-        if isinstance(entry.get("compareMetrics"), dict)
-        and isinstance(entry["compareMetrics"].get("maeRgb"), (int, float))
-    ]
+        compare_metrics = entry.get("compareMetrics")
+        if isinstance(compare_metrics, dict):
+            mae_rgb_value = compare_metrics.get("maeRgb")
+            if isinstance(mae_rgb_value, (int, float)):
+                mae_rgb_values.append(float(mae_rgb_value))
 
-    black_frame_candidates = [
-        entry["name"]
-        for entry in metrics_scenarios
-        if isinstance(entry.get("imageMetrics"), dict)
-        and isinstance(entry["imageMetrics"].get("nonBlackRatio"), (int, float))
-        and float(entry["imageMetrics"]["nonBlackRatio"]) < 0.01
-    ]
-    framebuffer_metric_mismatches = [
-        entry["name"]
-        for entry in metrics_scenarios
-        if isinstance(entry.get("framebufferNonBlackRatio"), (int, float))
-        and isinstance(entry.get("imageMetrics"), dict)
-        and isinstance(entry["imageMetrics"].get("nonBlackRatio"), (int, float))
-        and float(entry["framebufferNonBlackRatio"]) < 0.01
-        and float(entry["imageMetrics"]["nonBlackRatio"]) >= 0.01
-    ]
     if framebuffer_metric_mismatches:
         warnings.append(
             "Detected framebuffer/screenshot mismatch in scenarios: "
@@ -1927,16 +2226,14 @@ def run_pipeline(
         )
 
     overall_ok = all(bool(entry.get("ok")) for entry in runtime_scenarios)
-    tooling_failures = [
-        entry.get("name")
-        for entry in runtime_scenarios
-        if not bool(entry.get("ok")) and classify_failure_bucket(entry) == "tooling"
-    ]
-    app_failures = [
-        entry.get("name")
-        for entry in runtime_scenarios
-        if not bool(entry.get("ok")) and classify_failure_bucket(entry) == "app"
-    ]
+    # Classify each failed scenario once instead of once per bucket.
+    tooling_failures: List[Any] = []
+    app_failures: List[Any] = []
+    for entry in runtime_scenarios:
+        if bool(entry.get("ok")):
+            continue
+        bucket = tooling_failures if classify_failure_bucket(entry) == "tooling" else app_failures
+        bucket.append(entry.get("name"))
     primary_next_action = None if overall_ok else select_primary_next_action(runtime_scenarios)
     black_screen_verdict = build_black_screen_verdict(
         metrics_scenarios=metrics_scenarios,
@@ -1945,8 +2242,10 @@ def run_pipeline(
         framebuffer_metric_mismatches=framebuffer_metric_mismatches,
     )
 
+    # The three artifacts describe the same run, so they share one generatedAt.
+    generated_at = iso_now()
     runtime_payload = {
-        "generatedAt": iso_now(),
+        "generatedAt": generated_at,
         "mode": "terminal-probe",
         "modeSelection": mode_selection,
         "sessionId": session_id,
@@ -1960,14 +2259,14 @@ def run_pipeline(
     }
 
     metrics_payload = {
-        "generatedAt": iso_now(),
+        "generatedAt": generated_at,
         "sessionId": session_id,
         "scenarioCount": len(metrics_scenarios),
         "scenarios": metrics_scenarios,
     }
 
     summary_payload = {
-        "generatedAt": iso_now(),
+        "generatedAt": generated_at,
         "mode": "terminal-probe",
         "modeSelection": mode_selection,
         "sessionId": session_id,
@@ -2081,6 +2380,11 @@ def main() -> int:
         action="store_true",
         help="Disable navigate->evaluate(location.assign) fallback for known navigate transport failures",
     )
+    parser.add_argument(
+        "--no-metrics-cache",
+        action="store_true",
+        help="Always recompute screenshot metrics instead of reusing cached results for identical images",
+    )
     parser.add_argument("--json", action="store_true", help="Print machine-readable output")
 
     args = parser.parse_args()
@@ -2172,6 +2476,7 @@ def main() -> int:
 
         scenarios = load_scenarios(scenarios_path)
         output_dir = prepare_output_dir(project_root, args.output_dir, str(resolved_session["resolvedSessionId"]))
+        cache_root = project_root / "logs" / "browser-debug" / ".terminal-probe-cache"
         result = run_pipeline(
             core_base_url=str(args.core_base_url),
             session_id=str(resolved_session["resolvedSessionId"]),
@@ -2183,6 +2488,7 @@ def main() -> int:
             resize_interpolation=str(args.resize_interpolation),
             navigate_fallback=not bool(args.no_navigate_fallback),
             mode_selection=mode_selection,
+            metrics_cache_dir=None if args.no_metrics_cache else cache_root / "metrics",
         )
         result["modeSelection"] = mode_selection
         result["resolvedSession"] = resolved_session
@@ -3,11 +3,16 @@
 
 from __future__ import annotations
 
+import copy
 import importlib.util
+import json
 import os
 import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from types import ModuleType
+from typing import List
 
 
 SCRIPT_PATH = Path(__file__).resolve().parent / "bootstrap_browser_debug.py"
@@ -46,9 +51,85 @@ def run_playwright_check(
             os.environ["PLAYWRIGHT_WRAPPER_PATH"] = original_wrapper
 
 
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    client_ports: List[int] = []
+
+    def do_GET(self) -> None:  # noqa: N802
+        self.client_ports.append(self.client_address[1])
+        status = 200 if self.path == "/health" else 404
+        body = json.dumps({"status": "ok"} if status == 200 else {"error": "not found"}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        return
+
+
+def check_http_keep_alive(module: ModuleType) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        for _ in range(3):
+            assert module.check_health(base_url) == {"status": "ok"}
+        health = module.http_request("GET", f"{base_url}/health")
+        assert health["headers"].get("content-type") == "application/json", health
+        assert health["headers"]["Content-Length"] == str(len(health["body"])), health
+        assert "content-length" in dict(health["headers"]), health
+        missing = module.http_request("GET", f"{base_url}/missing")
+        assert missing["ok"] is False, missing
+        assert missing["status"] == 404, missing
+        assert missing["json"] == {"error": "not found"}, missing
+        assert "404" in missing["error"], missing
+        assert len(set(KeepAliveHandler.client_ports)) == 1, KeepAliveHandler.client_ports
+    finally:
+        module.HTTP_POOL.clear()
+        server.shutdown()
+        server.server_close()
+
+    unreachable = module.http_request("GET", base_url + "/health", timeout=0.5)
+    assert unreachable["ok"] is False, unreachable
+    assert unreachable["status"] is None, unreachable
+    assert module.check_endpoint_unavailable({"status": None, "reason": unreachable["error"]}), unreachable
+    assert module.wait_for_health(base_url, deadline_seconds=0.2) is None
+
+    unreachable_query = module.probe_query(f"{base_url}/events/query", trace_id="trace-1", tag="bootstrap-probe")
+    assert unreachable_query["ok"] is False, unreachable_query
+    assert unreachable_query["attempt"] == 1, unreachable_query
+    assert module.check_endpoint_unavailable(unreachable_query), unreachable_query
+
+
 def main() -> int:
     module = load_module()
 
+    check_http_keep_alive(module)
+
+    assert module.slugify("  My App__Name ") == "my-app-name"
+    assert module.slugify("Prøject Ünïcode") == "pr-ject-n-code"
+    assert module.slugify("---") == "project"
+
+    assert module.parse_json_or_none(' {"status": "ok"}') == {"status": "ok"}
+    assert module.parse_json_or_none("[1, 2]") == [1, 2]
+    assert module.parse_json_or_none("<html>Bad Gateway</html>") is None
+    assert module.parse_json_or_none("   ") is None
+    assert module.parse_json_or_none("{not json") is None
+
+    # Cached origin parts are shared between callers, so they must not be mutable.
+    origin_parts = module.parse_origin_parts("HTTP://LocalHost:5173/app")
+    assert origin_parts == {"scheme": "http", "hostname": "localhost", "port": 5173, "origin": "http://LocalHost:5173"}, origin_parts
+    try:
+        origin_parts["hostname"] = "example.com"  # type: ignore[index]
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("parse_origin_parts result should be read-only")
+    assert module.parse_origin_parts("HTTP://LocalHost:5173/app")["hostname"] == "localhost"
+
     app_url_check = module.enrich_app_url_check(
         module.evaluate_app_url_check("http://localhost:3000", "http://localhost:5173"),
         project_root=Path("/tmp/sample-project"),
@@ -101,6 +182,21 @@ def main() -> int:
     assert loopback_equivalent_check["nextAction"] == "optional-sync", loopback_equivalent_check
     assert loopback_equivalent_check["reasonCode"] == "APP_URL_LOOPBACK_DRIFT", loopback_equivalent_check
 
+    base_config = module.validate_config(module.default_project_config(Path("/tmp/sample-project")))
+    base_config["capture"]["allowedDomains"] = ["localhost"]
+    base_config_snapshot = copy.deepcopy(base_config)
+    recommended_config, recommendations, _ = module.build_recommendations(base_config, "http://127.0.0.1:5173")
+    assert base_config == base_config_snapshot, base_config
+    assert recommended_config["appUrl"] == "http://127.0.0.1:5173", recommended_config
+    assert recommended_config["capture"]["allowedDomains"] == ["localhost", "127.0.0.1"], recommended_config
+    assert [item["type"] for item in recommendations] == ["sync-app-url", "add-loopback-domains"], recommendations
+
+    assert module.check_endpoint_unavailable({"status": None, "reason": "[Errno 111] Connection REFUSED"})
+    assert module.check_endpoint_unavailable({"status": None, "reason": "timed out"})
+    assert module.check_endpoint_unavailable({"status": 502, "reason": None})
+    assert not module.check_endpoint_unavailable({"status": None, "reason": "skipped because debugPost failed"})
+    assert not module.check_endpoint_unavailable({"status": None, "reason": None})
+
     mismatch_category = module.classify_instrumentation_failure(
         {
             "appUrl": {"ok": False, "status": "mismatch"},
@@ -306,6 +402,44 @@ def main() -> int:
     with tempfile.TemporaryDirectory(prefix="bootstrap-browser-debug-smoke-") as temp_dir:
         root = Path(temp_dir)
 
+        config_path = root / "browser-debug.json"
+        module.write_project_config(config_path, base_config)
+        module.write_project_config(config_path, recommended_config)
+        assert json.loads(config_path.read_text(encoding="utf-8")) == recommended_config
+        assert config_path.read_text(encoding="utf-8").endswith("}\n")
+        assert sorted(path.name for path in root.iterdir()) == ["browser-debug.json"], list(root.iterdir())
+
+        # New configs follow the umask; rewrites keep the existing file's mode.
+        fresh_config_path = root / "fresh-browser-debug.json"
+        previous_umask = os.umask(0o027)
+        try:
+            module.write_project_config(fresh_config_path, base_config)
+        finally:
+            os.umask(previous_umask)
+        assert fresh_config_path.stat().st_mode & 0o777 == 0o640, oct(fresh_config_path.stat().st_mode)
+        os.chmod(fresh_config_path, 0o600)
+        module.write_project_config(fresh_config_path, recommended_config)
+        assert fresh_config_path.stat().st_mode & 0o777 == 0o600, oct(fresh_config_path.stat().st_mode)
+
+        # A failed rename must not leave the temp file next to the config.
+        original_replace = os.replace
+
+        def failing_replace(*_args: object, **_kwargs: object) -> None:
+            raise OSError("rename failed")
+
+        os.replace = failing_replace
+        try:
+            module.write_project_config(config_path, base_config)
+        except OSError:
+            pass
+        else:
+            raise AssertionError("write_project_config should surface the rename failure")
+        finally:
+            os.replace = original_replace
+        assert json.loads(config_path.read_text(encoding="utf-8")) == recommended_config
+        fresh_config_path.unlink()
+        assert sorted(path.name for path in root.iterdir()) == ["browser-debug.json"], list(root.iterdir())
+
         wrapper_ok = root / "wrapper_ok.sh"
         write_executable(
             wrapper_ok,
@@ -339,8 +473,14 @@ def main() -> int:
         assert result_wrapper_ok["mode"] == "wrapper", result_wrapper_ok
         assert result_wrapper_ok["wrapperSmoke"]["ok"] is True, result_wrapper_ok
         assert result_wrapper_ok["functionalSmoke"]["ok"] is True, result_wrapper_ok
+        assert result_wrapper_ok["npxSmoke"]["skipped"] is True, result_wrapper_ok
         assert "selectedCommand" in result_wrapper_ok, result_wrapper_ok
 
+        result_wrapper_ok_cached = run_playwright_check(module, wrapper_ok, npx_ok)
+        assert result_wrapper_ok_cached == result_wrapper_ok, result_wrapper_ok_cached
+        assert result_wrapper_ok_cached is not result_wrapper_ok, result_wrapper_ok_cached
+        assert module.cached_playwright_tool_check.cache_info().hits >= 1, module.cached_playwright_tool_check.cache_info()
+
         result_wrapper_ok_without_npx = run_playwright_check(module, wrapper_ok, None, npx_ok=False)
         assert result_wrapper_ok_without_npx["ok"] is True, result_wrapper_ok_without_npx
         assert result_wrapper_ok_without_npx["mode"] == "wrapper", result_wrapper_ok_without_npx
@@ -366,6 +506,42 @@ def main() -> int:
         assert result_wrapper_fail_npx_ok["functionalSmoke"]["ok"] is True, result_wrapper_fail_npx_ok
         assert result_wrapper_fail_npx_ok["selectedBinary"] == "playwright-mcp", result_wrapper_fail_npx_ok
 
+        # The functional smoke finishes before any npx CLI probe starts, and the legacy
+        # playwright-cli probe only runs after the primary playwright-mcp probe fails.
+        probe_log = root / "npx_probes.log"
+        for mcp_exit_code, expected_probes, expected_binary in (
+            (0, ["functional-start", "functional-end", "playwright-mcp"], "playwright-mcp"),
+            (5, ["functional-start", "functional-end", "playwright-mcp", "playwright-cli"], "playwright-cli"),
+        ):
+            npx_logging = root / f"npx_logging_{mcp_exit_code}.sh"
+            write_executable(
+                npx_logging,
+                "#!/usr/bin/env bash\n"
+                "set -euo pipefail\n"
+                "for arg in \"$@\"; do\n"
+                "  if [[ \"$arg\" == \"playwright-mcp\" ]]; then\n"
+                f"    echo playwright-mcp >> \"{probe_log}\"\n"
+                f"    exit {mcp_exit_code}\n"
+                "  fi\n"
+                "  if [[ \"$arg\" == \"playwright-cli\" ]]; then\n"
+                f"    echo playwright-cli >> \"{probe_log}\"\n"
+                "    exit 0\n"
+                "  fi\n"
+                "  if [[ \"$arg\" == \"node\" ]]; then\n"
+                f"    echo functional-start >> \"{probe_log}\"\n"
+                "    sleep 0.3\n"
+                f"    echo functional-end >> \"{probe_log}\"\n"
+                "    exit 0\n"
+                "  fi\n"
+                "done\n"
+                "exit 0\n",
+            )
+            probe_log.write_text("", encoding="utf-8")
+            result_probe_order = run_playwright_check(module, wrapper_fail, npx_logging)
+            assert result_probe_order["ok"] is True, result_probe_order
+            assert result_probe_order["selectedBinary"] == expected_binary, result_probe_order
+            assert probe_log.read_text(encoding="utf-8").split() == expected_probes, probe_log.read_text(encoding="utf-8")
+
         npx_fail = root / "npx_fail.sh"
         write_executable(
             npx_fail,
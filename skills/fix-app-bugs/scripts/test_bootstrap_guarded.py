@@ -4,6 +4,7 @@
 from __future__ import annotations
 
 import json
+import os
 import subprocess
 import tempfile
 from pathlib import Path
@@ -36,6 +37,18 @@ def run_case(project_root: Path, bootstrap_script: Path) -> tuple[int, dict]:
     return result.returncode, payload
 
 
+def run_default_case(project_root: Path, plugin_root: Path) -> tuple[int, dict]:
+    result = subprocess.run(
+        ["python3", str(SCRIPT_PATH), "--project-root", str(project_root), "--json"],
+        check=False,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "BROWSER_DEBUG_PLUGIN_ROOT": str(plugin_root)},
+    )
+    payload = json.loads(result.stdout)
+    return result.returncode, payload
+
+
 def assert_fallback(payload: dict, reason_contains: str) -> None:
     assert payload["bootstrap"]["status"] == "fallback", payload
     assert reason_contains in payload["bootstrap"]["reason"], payload
@@ -60,6 +73,13 @@ def main() -> int:
         assert code == 0
         assert_fallback(payload, "bootstrap script not found")
 
+        invalid_plugin_root = root / "not-a-plugin"
+        invalid_plugin_root.mkdir()
+        code, payload = run_default_case(project_root, invalid_plugin_root)
+        assert code == 0
+        assert_fallback(payload, "Plugin root is invalid")
+        assert payload["bootstrap"]["scriptPath"] == str(SCRIPT_PATH.parent / "bootstrap_browser_debug.py"), payload
+
         failing_script = root / "failing_bootstrap.py"
         write_executable(
             failing_script,
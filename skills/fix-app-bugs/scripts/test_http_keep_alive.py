@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Smoke/regression tests for http_keep_alive.py."""
+
+from __future__ import annotations
+
+import runpy
+import threading
+import time
+from http.client import HTTPConnection
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, List
+
+
+SCRIPT_PATH = Path(__file__).resolve().parent / "http_keep_alive.py"
+
+
+class PoolHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    seen: List[str] = []
+    client_ports: List[int] = []
+
+    def do_POST(self) -> None:  # noqa: N802
+        content_length = int(self.headers.get("Content-Length", "0"))
+        self.rfile.read(content_length)
+        self.seen.append(self.path)
+        self.client_ports.append(self.client_address[1])
+        if self.path == "/drop":
+            # Request received and applied, but the connection dies before any response.
+            self.close_connection = True
+            return
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        if self.path == "/ok-then-close":
+            # Keep-alive response, then the server drops the idle socket (like an idle timeout).
+            self.close_connection = True
+
+    def log_message(self, _format: str, *_args: object) -> None:
+        return
+
+
+class SendFailsConnection(HTTPConnection):
+    def request(self, *args: Any, **kwargs: Any) -> None:
+        raise BrokenPipeError("idle socket closed before send")
+
+
+def main() -> int:
+    module = runpy.run_path(str(SCRIPT_PATH), run_name="http_keep_alive_test")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PoolHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    netloc = f"127.0.0.1:{server.server_port}"
+    base_url = f"http://{netloc}"
+    pool = module["KeepAliveConnectionPool"]()
+    headers = {"Content-Type": "application/json"}
+    try:
+        status, _reason, _headers, raw_body = pool.request("POST", f"{base_url}/ok", b"{}", headers, 2.0)
+        assert status == 200 and raw_body == b'{"ok": true}', (status, raw_body)
+        assert module["connection_dropped"](pool.idle[("http", netloc)][0]) is False, pool.idle
+
+        # A request that reached the server must not be replayed, even on a reused socket.
+        try:
+            pool.request("POST", f"{base_url}/drop", b"{}", headers, 2.0)
+        except ConnectionError:
+            pass
+        else:
+            raise AssertionError("dropped POST should surface a connection error")
+        assert PoolHandler.seen.count("/drop") == 1, PoolHandler.seen
+
+        # An idle socket the server already closed is detected and replaced before sending.
+        pool.request("POST", f"{base_url}/ok-then-close", b"{}", headers, 2.0)
+        time.sleep(0.2)
+        parked = pool.idle[("http", netloc)]
+        assert len(parked) == 1 and module["connection_dropped"](parked[0]) is True, parked
+        status, _reason, _headers, _raw_body = pool.request("POST", f"{base_url}/ok", b"{}", headers, 2.0)
+        assert status == 200, status
+        assert PoolHandler.client_ports[-1] != PoolHandler.client_ports[-2], PoolHandler.client_ports
+
+        # A send failure on a reused socket happens before the request is on the wire: retry once fresh.
+        pool.clear()
+        pool.release(("http", netloc), SendFailsConnection(netloc, timeout=2.0))
+        ok_before = PoolHandler.seen.count("/ok")
+        status, _reason, _headers, _raw_body = pool.request("POST", f"{base_url}/ok", b"{}", headers, 2.0)
+        assert status == 200, status
+        assert PoolHandler.seen.count("/ok") == ok_before + 1, PoolHandler.seen
+    finally:
+        pool.clear()
+        server.shutdown()
+        server.server_close()
+
+    print("http_keep_alive smoke checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
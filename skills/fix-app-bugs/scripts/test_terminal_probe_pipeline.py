@@ -5,10 +5,14 @@ from __future__ import annotations
 
 import base64
 import json
+import os
 import runpy
+import struct
 import subprocess
 import tempfile
 import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
@@ -31,6 +35,7 @@ class FakeState:
     cdp_tab_opened: bool = False
     cdp_opened_urls: List[str] = field(default_factory=list)
     cdp_list_targets: List[Dict[str, Any]] = field(default_factory=list)
+    cdp_list_calls: int = 0
     fail_command: Optional[str] = None
     force_compare_dimension_mismatch_once: bool = False
     compare_dimension_mismatch_emitted: bool = False
@@ -238,6 +243,7 @@ class FakeCdpHandler(BaseHTTPRequestHandler):
 
     def do_GET(self) -> None:  # noqa: N802
         if self.path == "/json/list":
+            self.state.cdp_list_calls += 1
             self.send_response(200)
             self.send_header("Content-Type", "application/json")
             self.end_headers()
@@ -249,11 +255,230 @@ class FakeCdpHandler(BaseHTTPRequestHandler):
         return
 
 
+class KeepAliveCoreHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    client_ports: List[int] = []
+
+    def do_POST(self) -> None:  # noqa: N802
+        self.client_ports.append(self.client_address[1])
+        content_length = int(self.headers.get("Content-Length", "0"))
+        request_payload = json.loads(self.rfile.read(content_length).decode("utf-8"))
+        status = 200 if self.path == "/command" else 404
+        body = json.dumps({"ok": status == 200, "result": {"echo": request_payload}}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, _format: str, *_args: object) -> None:
+        return
+
+
+def run_keep_alive_case() -> None:
+    module = runpy.run_path(str(SCRIPT_PATH), run_name="terminal_probe_pipeline_keep_alive")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveCoreHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    core_url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        for index in range(3):
+            command_result = module["run_core_command"](core_url, "session-1", "wait", {"ms": index + 1}, 2.0)
+            assert command_result["ok"] is True, command_result
+            assert command_result["result"]["echo"]["payload"] == {"ms": index + 1}, command_result
+        missing = module["http_json"]("POST", f"{core_url}/missing", payload={}, timeout=2.0)
+        assert missing.ok is False and missing.status == 404, missing
+        assert "404" in str(missing.error), missing
+        assert len(set(KeepAliveCoreHandler.client_ports)) == 1, KeepAliveCoreHandler.client_ports
+    finally:
+        module["HTTP_POOL"].clear()
+        server.shutdown()
+        server.server_close()
+
+    unreachable = module["http_json"]("GET", f"{core_url}/health", timeout=0.5)
+    assert unreachable.ok is False and unreachable.status is None, unreachable
+
+
+def run_metrics_cache_case(root: Path) -> None:
+    module = runpy.run_path(str(SCRIPT_PATH), run_name="terminal_probe_pipeline_metrics_cache")
+    module_globals = module["compute_image_metrics_cached"].__globals__
+    computed: List[str] = []
+
+    def fake_compute_image_metrics(image_path: str, magick_binary: Optional[str]) -> Dict[str, Any]:
+        computed.append(image_path)
+        return {"ok": True, "tool": magick_binary, "reason": None, "mean": 0.5, "stddev": 0.1, "nonBlackRatio": 1.0}
+
+    module_globals["compute_image_metrics"] = fake_compute_image_metrics
+    module_globals["numpy"] = None
+    module_globals["RESULT_CACHE_MAX_ENTRIES"] = 2
+    compute_cached = module_globals["compute_image_metrics_cached"]
+    cache_dir = root / "metrics-cache"
+    images = []
+    for index in range(3):
+        image_path = root / f"metrics-{index}.bin"
+        image_path.write_bytes(f"image-{index}".encode("ascii"))
+        images.append(str(image_path))
+
+    assert compute_cached(images[0], "/usr/bin/magick", cache_dir)["ok"] is True
+    assert compute_cached(images[0], "/usr/bin/magick", cache_dir)["mean"] == 0.5
+    assert computed == [images[0]], computed
+
+    # Another backend must not be served results computed by the first one.
+    compute_cached(images[0], "/usr/bin/convert", cache_dir)
+    assert computed == [images[0], images[0]], computed
+    cache_entries = sorted(entry.name for entry in cache_dir.glob("*.json"))
+    assert len(cache_entries) == 2, cache_entries
+    assert all(name.startswith("metrics-v") for name in cache_entries), cache_entries
+
+    # Eviction drops the least recently used entry once the cache is over capacity.
+    for age, entry in enumerate(sorted(cache_dir.glob("*.json"), key=lambda item: "convert" in item.name)):
+        os.utime(entry, (1_000_000 + age, 1_000_000 + age))
+    compute_cached(images[1], "/usr/bin/magick", cache_dir)
+    assert len(list(cache_dir.glob("*.json"))) == 2, list(cache_dir.glob("*.json"))
+    compute_cached(images[0], "/usr/bin/convert", cache_dir)
+    compute_cached(images[0], "/usr/bin/magick", cache_dir)
+    assert computed == [images[0], images[0], images[1], images[0]], computed
+
+    compute_cached(images[2], "/usr/bin/magick", None)
+    compute_cached(images[2], "/usr/bin/magick", None)
+    assert computed[-2:] == [images[2], images[2]], computed
+
+
+def run_image_metrics_numpy_case(root: Path) -> None:
+    module = runpy.run_path(str(SCRIPT_PATH), run_name="terminal_probe_pipeline_image_metrics")
+    image_module = module["Image"]
+    if module["numpy"] is None or image_module is None:
+        return
+    compute_numpy = module["compute_image_metrics_numpy"]
+    red_luma = module["REC709_LUMA_WEIGHTS"][0]
+
+    rgb_path = root / "metrics-rgb.png"
+    rgb_image = image_module.new("RGB", (2, 2))
+    rgb_image.putdata([(0, 0, 0), (255, 255, 255), (255, 0, 0), (0, 0, 0)])
+    rgb_image.save(rgb_path)
+    rgb_gray = [0.0, 1.0, red_luma, 0.0]
+    rgb_metrics = compute_numpy(str(rgb_path))
+    assert rgb_metrics["tool"] == "numpy", rgb_metrics
+    assert_metrics_close(rgb_metrics, rgb_gray, non_black_ratio=0.5)
+
+    # Alpha is flattened onto black: transparent white counts as black, half-transparent red as dim red.
+    rgba_path = root / "metrics-rgba.png"
+    rgba_image = image_module.new("RGBA", (2, 2))
+    rgba_image.putdata([(0, 0, 0, 255), (255, 255, 255, 0), (255, 0, 0, 128), (255, 255, 255, 255)])
+    rgba_image.save(rgba_path)
+    rgba_gray = [0.0, 0.0, red_luma * 128 / 255, 1.0]
+    assert_metrics_close(compute_numpy(str(rgba_path)), rgba_gray, non_black_ratio=0.5)
+
+    # Strip boundaries must not change the result.
+    module["compute_image_metrics_numpy"].__globals__["IMAGE_METRICS_STRIP_ROWS"] = 1
+    assert_metrics_close(compute_numpy(str(rgba_path)), rgba_gray, non_black_ratio=0.5)
+
+    truncated_path = root / "metrics-truncated.png"
+    truncated_path.write_bytes(rgb_path.read_bytes()[:40])
+    assert compute_numpy(str(truncated_path)) is None
+
+    # Oversized images raise DecompressionBombError (not an OSError); they must fall back to ImageMagick.
+    def open_bomb(*_args: Any, **_kwargs: Any) -> Any:
+        raise image_module.DecompressionBombError("image too large")
+
+    original_open = image_module.open
+    image_module.open = open_bomb
+    try:
+        assert compute_numpy(str(rgb_path)) is None
+        fallback_metrics = module["compute_image_metrics"](str(rgb_path), None)
+        assert fallback_metrics["ok"] is False and "ImageMagick" in fallback_metrics["reason"], fallback_metrics
+    finally:
+        image_module.open = original_open
+
+
+def assert_metrics_close(metrics: Dict[str, Any], gray_values: List[float], non_black_ratio: float) -> None:
+    expected_mean = sum(gray_values) / len(gray_values)
+    expected_stddev = (sum((value - expected_mean) ** 2 for value in gray_values) / len(gray_values)) ** 0.5
+    assert metrics["ok"] is True, metrics
+    assert abs(metrics["mean"] - expected_mean) < 1e-6, (metrics, expected_mean)
+    assert abs(metrics["stddev"] - expected_stddev) < 1e-6, (metrics, expected_stddev)
+    assert metrics["nonBlackRatio"] == non_black_ratio, metrics
+
+
 def write_png(path: Path) -> None:
     png_base64 = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mP8/x8AAusB9WlAbWcAAAAASUVORK5CYII="
     path.write_bytes(base64.b64decode(png_base64))
 
 
+def write_sized_png(path: Path, width: int, height: int) -> None:
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    rows = b"".join(b"\x00" + b"\x80" * (width * 3) for _ in range(height))
+    path.write_bytes(
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+
+def run_metrics_pool_case(root: Path) -> None:
+    module = runpy.run_path(str(SCRIPT_PATH), run_name="terminal_probe_pipeline_metrics_pool")
+    module_globals = module["run_pipeline"].__globals__
+    scenario_class = module_globals["Scenario"]
+    snapshot_path = root / "pool-snapshot.png"
+    write_png(snapshot_path)
+    shutdowns: List[bool] = []
+
+    class RecordingExecutor(ThreadPoolExecutor):
+        def shutdown(self, *args: Any, **kwargs: Any) -> None:
+            shutdowns.append(True)
+            super().shutdown(*args, **kwargs)
+
+    def fake_run_core_command(
+        _core_base_url: str,
+        _session_id: Optional[str],
+        command: str,
+        _payload: Dict[str, Any],
+        _timeout_seconds: float,
+    ) -> Dict[str, Any]:
+        if command == "snapshot" and fail_snapshots:
+            raise RuntimeError("core went away")
+        return {"ok": True, "result": {"path": str(snapshot_path)}}
+
+    def failing_metrics(_image_path: str, _magick_binary: Optional[str], _cache_dir: Optional[Path]) -> Dict[str, Any]:
+        raise RuntimeError("decoder crashed")
+
+    module_globals["ThreadPoolExecutor"] = RecordingExecutor
+    module_globals["run_core_command"] = fake_run_core_command
+    module_globals["compute_image_metrics_cached"] = failing_metrics
+    module_globals["find_magick_binary"] = lambda: "/usr/bin/magick"
+    scenarios = [scenario_class(name=f"pool-{index}", commands=[], reference_image_path=None, full_page=False) for index in range(2)]
+
+    # A failed metrics job becomes an imageMetrics error entry instead of aborting the run.
+    fail_snapshots = False
+    output_dir = root / "metrics-pool"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    module["run_pipeline"]("http://127.0.0.1:9", "session-1", scenarios, output_dir, 1000)
+    assert shutdowns == [True], shutdowns
+    metrics_payload = json.loads((output_dir / "metrics.json").read_text(encoding="utf-8"))
+    for entry in metrics_payload["scenarios"]:
+        assert entry["imageMetrics"]["ok"] is False, entry
+        assert "decoder crashed" in entry["imageMetrics"]["reason"], entry
+
+    # A scenario that raises still shuts the metrics pool down.
+    fail_snapshots = True
+    try:
+        module["run_pipeline"]("http://127.0.0.1:9", "session-1", scenarios, output_dir, 1000)
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("run_pipeline should surface the scenario error")
+    assert shutdowns == [True, True], shutdowns
+
+
+def write_jpeg_header(path: Path, width: int, height: int) -> None:
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00"
+    sof0 = b"\xff\xc0" + struct.pack(">HBHHB", 17, 8, height, width, 3) + b"\x01\x22\x00\x02\x11\x01\x03\x11\x01"
+    path.write_bytes(b"\xff\xd8" + app0 + sof0 + b"\xff\xd9")
+
+
 def run_case(
     root: Path,
     state: FakeState,
@@ -319,8 +544,13 @@ def run_case(
 
 
 def main() -> int:
+    run_keep_alive_case()
+
     with tempfile.TemporaryDirectory(prefix="terminal-probe-pipeline-") as temp_dir:
         root = Path(temp_dir)
+        run_metrics_cache_case(root)
+        run_metrics_pool_case(root)
+        run_image_metrics_numpy_case(root)
         snapshot_path = root / "snapshot.png"
         reference_path = root / "reference.png"
         write_png(snapshot_path)
@@ -363,6 +593,30 @@ def main() -> int:
         assert observed_state.ensure_calls >= 1, observed_state
         assert observed_state.ensure_payloads[0]["matchStrategy"] == "origin-path", observed_state.ensure_payloads
 
+        # Every run must produce its own compare-reference event and artifacts in Core.
+        completed_rerun, payload_rerun, observed_rerun = run_case(baseline_dir, baseline_state, baseline_scenarios)
+        assert completed_rerun.returncode == 0, completed_rerun
+        compare_calls = [call for call in observed_rerun.command_calls if call.get("command") == "compare-reference"]
+        assert len(compare_calls) == 2, compare_calls
+        runtime_rerun = json.loads(Path(payload_rerun["runtimeJsonPath"]).read_text(encoding="utf-8"))
+        assert "cached" not in runtime_rerun["scenarios"][0]["compareReference"], runtime_rerun
+        metrics_cache_dir = baseline_dir / "logs" / "browser-debug" / ".terminal-probe-cache" / "metrics"
+        metrics_rerun = json.loads(Path(payload_rerun["metricsJsonPath"]).read_text(encoding="utf-8"))
+        if metrics_rerun["scenarios"][0]["imageMetrics"]["ok"]:
+            assert len(list(metrics_cache_dir.glob("metrics-v*.json"))) == 1, metrics_cache_dir
+
+        no_cache_dir = root / "no-metrics-cache"
+        no_cache_dir.mkdir(parents=True, exist_ok=True)
+        completed_no_cache, payload_no_cache, _ = run_case(
+            no_cache_dir,
+            FakeState(snapshot_path=snapshot_path),
+            baseline_scenarios,
+            extra_args=["--no-metrics-cache"],
+        )
+        assert completed_no_cache.returncode == 0, completed_no_cache
+        assert payload_no_cache["ok"] is True, payload_no_cache
+        assert not (no_cache_dir / "logs" / "browser-debug" / ".terminal-probe-cache").exists(), no_cache_dir
+
         force_state = FakeState(snapshot_path=snapshot_path, active_session_id="existing-session")
         force_dir = root / "force-new-session"
         force_dir.mkdir(parents=True, exist_ok=True)
@@ -375,6 +629,7 @@ def main() -> int:
         assert completed_force.returncode == 0, completed_force
         assert payload_force["ok"] is True, payload_force
         assert observed_force.stop_calls == 1, observed_force
+        assert observed_force.cdp_list_calls == 1, observed_force
         lifecycle_actions = payload_force["resolvedSession"]["lifecycle"]["actions"]
         assert any(item.get("action") == "stop-active-session" for item in lifecycle_actions), payload_force
 
@@ -390,6 +645,7 @@ def main() -> int:
         assert payload_open_tab["ok"] is True, payload_open_tab
         assert observed_open_tab.cdp_tab_opened is True, observed_open_tab
         assert observed_open_tab.ensure_calls >= 2, observed_open_tab
+        assert observed_open_tab.cdp_list_calls == 1, observed_open_tab
         assert payload_open_tab["resolvedSession"]["lifecycle"]["failureCategory"] == "target-not-found", payload_open_tab
 
         target_missing_disabled_state = FakeState(snapshot_path=snapshot_path, force_target_not_found_once=True)
@@ -453,6 +709,34 @@ def main() -> int:
         assert compare_entry["attempts"][0]["payload"]["dimensionPolicy"] == "strict", compare_entry
         assert compare_entry["attempts"][1]["payload"]["dimensionPolicy"] == "resize-reference-to-actual", compare_entry
 
+        # Known size mismatches go straight to the resize policy without a strict attempt.
+        png_reference_path = root / "reference-wide.png"
+        write_sized_png(png_reference_path, 3, 2)
+        jpeg_reference_path = root / "reference-wide.jpg"
+        write_jpeg_header(jpeg_reference_path, 4, 3)
+        truncated_reference_path = root / "reference-truncated.png"
+        truncated_reference_path.write_bytes(png_reference_path.read_bytes()[:20])
+        for case_name, case_reference, expected_policies in (
+            ("direct-resize-png", png_reference_path, ["resize-reference-to-actual"]),
+            ("direct-resize-jpeg", jpeg_reference_path, ["resize-reference-to-actual"]),
+            ("unknown-size", truncated_reference_path, ["strict"]),
+        ):
+            case_dir = root / case_name
+            case_dir.mkdir(parents=True, exist_ok=True)
+            case_scenarios = [{**baseline_scenarios[0], "referenceImagePath": str(case_reference)}]
+            completed_case, payload_case, observed_case = run_case(
+                case_dir,
+                FakeState(snapshot_path=snapshot_path),
+                case_scenarios,
+            )
+            assert completed_case.returncode == 0, completed_case
+            runtime_case = json.loads(Path(payload_case["runtimeJsonPath"]).read_text(encoding="utf-8"))
+            case_compare = runtime_case["scenarios"][0]["compareReference"]
+            assert [attempt["payload"]["dimensionPolicy"] for attempt in case_compare["attempts"]] == expected_policies, case_compare
+            assert case_compare["fallbackApplied"] is (expected_policies[0] != "strict"), case_compare
+            case_compare_calls = [call for call in observed_case.command_calls if call.get("command") == "compare-reference"]
+            assert len(case_compare_calls) == 1, case_compare_calls
+
         navigate_fallback_scenarios = [
             {
                 "name": "navigate-fallback",
@@ -511,6 +795,62 @@ def main() -> int:
         assert retry_exact_command.count("--tab-url-match-strategy") == 1, retry_exact_command
         assert "--tab-url-match-strategy origin-path" not in retry_exact_command, retry_exact_command
 
+        urls_match = constants["urls_match"]
+        assert urls_match("http://127.0.0.1:5173/?view=grid", "http://127.0.0.1:5173/", "origin-path")
+        assert urls_match("HTTP://LOCALHOST/app", "http://localhost:80/other", "origin")
+        assert not urls_match("http://127.0.0.1:5173/a", "http://127.0.0.1:5173/b", "origin-path")
+        assert not urls_match("http://127.0.0.1:5173/?a", "http://127.0.0.1:5173/", "exact")
+        assert not urls_match("not a url", "http://127.0.0.1:5173/", "origin")
+
+        match_cdp_targets = constants["match_cdp_targets"]
+        listed = {
+            "ok": True,
+            "status": 200,
+            "targets": [
+                {"id": "a", "url": "http://127.0.0.1:5173/", "type": "page"},
+                {"id": "b", "url": "http://127.0.0.1:5173/?tab=2", "type": "page"},
+                {"id": "c", "url": "http://127.0.0.1:5173/?tab=2", "type": "page"},
+            ],
+        }
+        exact_match = match_cdp_targets(listed, "http://127.0.0.1:5173/", "exact")
+        assert exact_match["ok"] is True and exact_match["targetId"] == "a", exact_match
+        duplicate_match = match_cdp_targets(listed, "http://127.0.0.1:5173/?tab=2", "exact")
+        assert duplicate_match["errorCode"] == "AMBIGUOUS_TARGET", duplicate_match
+        assert duplicate_match["matchCount"] == 2, duplicate_match
+        missing_match = match_cdp_targets(listed, "http://127.0.0.1:5173/missing", "exact")
+        assert missing_match["errorCode"] == "TARGET_NOT_FOUND", missing_match
+
+        sanitize_body_snippet = constants["sanitize_body_snippet"]
+        assert sanitize_body_snippet({"token": "abc", "ok": True}) == '{"token": "<redacted>", "ok": true}'
+        assert sanitize_body_snippet("Authorization:\r\n  Bearer abc.def==  done") == "Authorization: Bearer <redacted> done"
+        assert sanitize_body_snippet(" \n\t ") is None
+        assert sanitize_body_snippet("x" * 700) == "x" * 597 + "..."
+
+        read_image_dimensions = constants["read_image_dimensions"]
+        assert read_image_dimensions(str(snapshot_path)) == (1, 1)
+        assert read_image_dimensions(str(png_reference_path)) == (3, 2)
+        assert read_image_dimensions(str(jpeg_reference_path)) == (4, 3)
+        assert read_image_dimensions(str(truncated_reference_path)) is None
+        no_frame_jpeg_path = root / "no-frame.jpg"
+        no_frame_jpeg_path.write_bytes(jpeg_reference_path.read_bytes()[:20] + b"\xff\xd9")
+        assert read_image_dimensions(str(no_frame_jpeg_path)) is None
+        cut_jpeg_path = root / "cut.jpg"
+        cut_jpeg_path.write_bytes(jpeg_reference_path.read_bytes()[:25])
+        assert read_image_dimensions(str(cut_jpeg_path)) is None
+        text_path = root / "not-an-image.txt"
+        text_path.write_text("plain text", encoding="utf-8")
+        assert read_image_dimensions(str(text_path)) is None
+        assert read_image_dimensions(str(root / "missing.png")) is None
+
+        write_json = constants["write_json"]
+        artifact_path = root / "artifact.json"
+        artifact_payload = {"url": "http://127.0.0.1:5173/é", "values": [1e-05, 1e16, float("nan")], "empty": {}}
+        write_json(artifact_path, artifact_payload)
+        expected_artifact = json.dumps(artifact_payload, indent=2, ensure_ascii=False) + "\n"
+        assert artifact_path.read_bytes() == expected_artifact.encode("utf-8"), artifact_path.read_bytes()
+        write_json(artifact_path, {"message": "broken \ud800 surrogate"})
+        assert artifact_path.read_bytes() == b'{\n  "message": "broken \\ud800 surrogate"\n}\n', artifact_path.read_bytes()
+
     print("terminal_probe_pipeline smoke checks passed")
     return 0
 
@@ -174,32 +174,47 @@ function resizeNearest(image: DecodedImage, targetWidth: number, targetHeight: n
 
 function resizeBilinear(image: DecodedImage, targetWidth: number, targetHeight: number): Uint8Array {
   const resized = new Uint8Array(targetWidth * targetHeight * 4);
-  const maxX = image.width - 1;
-  const maxY = image.height - 1;
+  const { width, height, data } = image;
+  const maxX = width - 1;
+  const maxY = height - 1;
+  const rowStride = width * 4;
+
+  // Source columns and weights depend only on x: compute them once instead of per row and channel.
+  const leftOffsets = new Int32Array(targetWidth);
+  const rightOffsets = new Int32Array(targetWidth);
+  const xWeights = new Float64Array(targetWidth);
+  for (let x = 0; x < targetWidth; x += 1) {
+    const srcX = ((x + 0.5) * width) / targetWidth - 0.5;
+    const x0 = clamp(Math.floor(srcX), 0, maxX);
+    leftOffsets[x] = x0 * 4;
+    rightOffsets[x] = clamp(x0 + 1, 0, maxX) * 4;
+    xWeights[x] = clamp(srcX - x0, 0, 1);
+  }
 
+  let dstIdx = 0;
   for (let y = 0; y < targetHeight; y += 1) {
-    const srcY = ((y + 0.5) * image.height) / targetHeight - 0.5;
+    const srcY = ((y + 0.5) * height) / targetHeight - 0.5;
     const y0 = clamp(Math.floor(srcY), 0, maxY);
-    const y1 = clamp(y0 + 1, 0, maxY);
+    const topRow = y0 * rowStride;
+    const bottomRow = clamp(y0 + 1, 0, maxY) * rowStride;
     const wy = clamp(srcY - y0, 0, 1);
 
     for (let x = 0; x < targetWidth; x += 1) {
-      const srcX = ((x + 0.5) * image.width) / targetWidth - 0.5;
-      const x0 = clamp(Math.floor(srcX), 0, maxX);
-      const x1 = clamp(x0 + 1, 0, maxX);
-      const wx = clamp(srcX - x0, 0, 1);
-      const dstIdx = (y * targetWidth + x) * 4;
+      const wx = xWeights[x];
+      const left = leftOffsets[x];
+      const right = rightOffsets[x];
 
       for (let channel = 0; channel < 4; channel += 1) {
-        const topLeft = image.data[(y0 * image.width + x0) * 4 + channel] ?? 0;
-        const topRight = image.data[(y0 * image.width + x1) * 4 + channel] ?? 0;
-        const bottomLeft = image.data[(y1 * image.width + x0) * 4 + channel] ?? 0;
-        const bottomRight = image.data[(y1 * image.width + x1) * 4 + channel] ?? 0;
+        const topLeft = data[topRow + left + channel];
+        const topRight = data[topRow + right + channel];
+        const bottomLeft = data[bottomRow + left + channel];
+        const bottomRight = data[bottomRow + right + channel];
 
         const top = topLeft * (1 - wx) + topRight * wx;
         const bottom = bottomLeft * (1 - wx) + bottomRight * wx;
         resized[dstIdx + channel] = Math.round(top * (1 - wy) + bottom * wy);
       }
+      dstIdx += 4;
     }
   }
 
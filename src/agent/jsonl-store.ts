@@ -17,8 +17,36 @@ export type ArtifactRun = {
   dir: string;
 };
 
+type AppendListener = (event: RuntimeEvent) => void;
+
+function eventMatchesQuery(event: RuntimeEvent, params: QueryRequest, fromTs: number, toTs: number): boolean {
+  const eventTs = new Date(event.ts).getTime();
+  if (Number.isNaN(eventTs) || eventTs < fromTs || eventTs > toTs) {
+    return false;
+  }
+
+  if (params.tag && event.tag !== params.tag) {
+    return false;
+  }
+
+  if (params.traceId && event.traceId !== params.traceId) {
+    return false;
+  }
+
+  if (params.sessionId && event.sessionId !== params.sessionId) {
+    return false;
+  }
+
+  if (params.eventType && event.eventType !== params.eventType) {
+    return false;
+  }
+
+  return true;
+}
+
 export class JsonlStore {
   private readonly rootDir: string;
+  private readonly appendListeners = new Set<AppendListener>();
 
   constructor(rootDir: string) {
     this.rootDir = rootDir;
@@ -33,6 +61,9 @@ export class JsonlStore {
     const filePath = path.join(this.rootDir, `${event.sessionId}.jsonl`);
     fs.mkdirSync(path.dirname(filePath), { recursive: true });
     fs.appendFileSync(filePath, `${JSON.stringify(event)}\n`, "utf8");
+    for (const listener of this.appendListeners) {
+      listener(event);
+    }
   }
 
   appendEvents(events: RuntimeEvent[]): void {
@@ -41,12 +72,13 @@ export class JsonlStore {
     }
   }
 
-  saveScreenshot(sessionId: string, screenshotBase64: string): string {
+  async saveScreenshot(sessionId: string, screenshotBase64: string): Promise<string> {
     const dir = path.join(this.rootDir, sessionId, "screenshots");
-    fs.mkdirSync(dir, { recursive: true });
+    await fs.promises.mkdir(dir, { recursive: true });
     const fileName = `${Date.now()}.png`;
     const filePath = path.join(dir, fileName);
-    fs.writeFileSync(filePath, Buffer.from(screenshotBase64, "base64"));
+    // Multi-MB full-page captures: write off the event loop so ingest/query requests keep flowing.
+    await fs.promises.writeFile(filePath, Buffer.from(screenshotBase64, "base64"));
     return filePath;
   }
 
@@ -83,6 +115,28 @@ export class JsonlStore {
     return filePath;
   }
 
+  // Resolves true as soon as an appended event matches the query filters, or false after timeoutMs.
+  // Subscribes synchronously, so nothing appended after a preceding query() can be missed.
+  waitForMatchingEvent(params: QueryRequest, timeoutMs: number): Promise<boolean> {
+    const fromTs = new Date(params.from).getTime();
+    const toTs = new Date(params.to).getTime();
+
+    return new Promise((resolve) => {
+      const finish = (matched: boolean) => {
+        clearTimeout(timer);
+        this.appendListeners.delete(listener);
+        resolve(matched);
+      };
+      const listener: AppendListener = (event) => {
+        if (eventMatchesQuery(event, params, fromTs, toTs)) {
+          finish(true);
+        }
+      };
+      const timer = setTimeout(() => finish(false), timeoutMs);
+      this.appendListeners.add(listener);
+    });
+  }
+
   query(params: QueryRequest): QueryResult {
     const fromTs = new Date(params.from).getTime();
     const toTs = new Date(params.to).getTime();
@@ -107,24 +161,7 @@ export class JsonlStore {
           continue;
         }
 
-        const eventTs = new Date(parsed.ts).getTime();
-        if (Number.isNaN(eventTs) || eventTs < fromTs || eventTs > toTs) {
-          continue;
-        }
-
-        if (params.tag && parsed.tag !== params.tag) {
-          continue;
-        }
-
-        if (params.traceId && parsed.traceId !== params.traceId) {
-          continue;
-        }
-
-        if (params.sessionId && parsed.sessionId !== params.sessionId) {
-          continue;
-        }
-
-        if (params.eventType && parsed.eventType !== params.eventType) {
+        if (!eventMatchesQuery(parsed, params, fromTs, toTs)) {
           continue;
         }
 
@@ -1007,7 +1007,12 @@ export class AgentRuntime {
         return sendError(reply, 422, "VALIDATION_ERROR", "Query date range is invalid");
       }
 
-      const result = this.store.query(parsed.data);
+      let result = this.store.query(parsed.data);
+      const waitMs = parsed.data.waitMs ?? 0;
+      // Park the request until an appended event matches instead of rescanning the log directory.
+      if (result.count === 0 && waitMs > 0 && (await this.store.waitForMatchingEvent(parsed.data, waitMs))) {
+        result = this.store.query(parsed.data);
+      }
       return reply.code(200).send(result);
     });
 
@@ -1083,7 +1088,7 @@ export class AgentRuntime {
           if (command === "snapshot") {
             const payload = SnapshotPayloadSchema.parse(parsed.data.payload);
             const screenshotData = await this.cdpController.snapshot(payload.timeoutMs);
-            const screenshotPath = this.store.saveScreenshot(eventSessionId, screenshotData);
+            const screenshotPath = await this.store.saveScreenshot(eventSessionId, screenshotData);
             return { path: screenshotPath };
           }
           if (command === "compare-reference") {
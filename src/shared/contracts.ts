@@ -198,6 +198,7 @@ export const QueryRequestSchema = z.object({
   sessionId: z.string().optional(),
   eventType: RuntimeEventTypeSchema.optional(),
   limit: z.coerce.number().int().positive().max(2000).default(500),
+  waitMs: z.coerce.number().int().nonnegative().max(5000).optional(),
 });
 
 export const QueryResponseSchema = z.object({
@@ -335,6 +335,72 @@ describe("AgentRuntime APIs", () => {
     expect(traceEvent.data.authorization).toBe("[REDACTED]");
   });
 
+  it("holds /events/query open for waitMs until a matching event arrives", async () => {
+    const from = new Date(Date.now() - 60_000).toISOString();
+    const to = new Date(Date.now() + 60_000).toISOString();
+
+    const queryPromise = fetch(
+      `${ctx.coreUrl}/events/query?from=${encodeURIComponent(from)}&to=${encodeURIComponent(to)}&traceId=trace-wait&waitMs=2000`,
+    );
+    await new Promise((resolve) => setTimeout(resolve, 150));
+
+    const { response } = await postJson(
+      `${ctx.debugUrl}/debug`,
+      {
+        marker: "BUGFIX_TRACE",
+        tag: "wait-probe",
+        event: "late-event",
+        traceId: "trace-wait",
+      },
+      {
+        Origin: "http://allowed.local",
+      },
+    );
+    expect(response.status).toBe(202);
+
+    const queryResponse = await queryPromise;
+    const payload = (await queryResponse.json()) as {
+      count: number;
+      events: Array<Record<string, unknown>>;
+    };
+
+    expect(queryResponse.status).toBe(200);
+    expect(payload.count).toBe(1);
+    expect(payload.events[0]?.traceId).toBe("trace-wait");
+  });
+
+  it("returns an empty /events/query result after waitMs when only non-matching events arrive", async () => {
+    const from = new Date(Date.now() - 60_000).toISOString();
+    const to = new Date(Date.now() + 60_000).toISOString();
+    const startedAt = Date.now();
+
+    const queryPromise = fetch(
+      `${ctx.coreUrl}/events/query?from=${encodeURIComponent(from)}&to=${encodeURIComponent(to)}&traceId=trace-never&waitMs=400`,
+    );
+    await new Promise((resolve) => setTimeout(resolve, 100));
+
+    const { response } = await postJson(
+      `${ctx.debugUrl}/debug`,
+      {
+        marker: "BUGFIX_TRACE",
+        tag: "wait-probe",
+        event: "other-event",
+        traceId: "trace-other",
+      },
+      {
+        Origin: "http://allowed.local",
+      },
+    );
+    expect(response.status).toBe(202);
+
+    const queryResponse = await queryPromise;
+    const payload = (await queryResponse.json()) as { count: number };
+
+    expect(queryResponse.status).toBe(200);
+    expect(payload.count).toBe(0);
+    expect(Date.now() - startedAt).toBeGreaterThanOrEqual(350);
+  });
+
   it("rejects /debug event with invalid marker", async () => {
     const { response, json } = await postJson(
       `${ctx.debugUrl}/debug`,